@@ -56,6 +56,7 @@ const TicTacToe_multi: React.FC<Props> = ({ squares = INITIAL_GRID }) => {
   const opponentRef = useRef<string | null>(null);
   const currentTurnRef = useRef<number | null>(null);
   const gameStateRef = useRef(gameState)
+  const resumingRef = useRef(false);
 
   useEffect(() => {
     gameStateRef.current = gameState;
@@ -95,8 +96,50 @@ const TicTacToe_multi: React.FC<Props> = ({ squares = INITIAL_GRID }) => {
 
     const setupGame = () => {
       console.log("Socket connection established. ID:", socket.id);
-      console.log("Joining game...");
-      socket.emit("join_game");
+      // game_resumable, sent during the handshake, is delivered right after "connect"
+      queueMicrotask(() => {
+        if (!resumingRef.current) {
+          console.log("Joining game...");
+          socket.emit("join_game");
+        }
+      });
+    };
+
+    const handleGameResumable = (data: { game_id: string }) => {
+      resumingRef.current = true;
+      socket.emit("resume_game", { game_id: data.game_id });
+      console.log("handleGameResumable");
+    };
+
+    const handleGameResumed = (data: {
+      game_id: string;
+      opponent: string;
+      symbol: string;
+      current_turn: string;
+      moves: Array<{ ply: number; position: number }>;
+    }) => {
+      resumingRef.current = false;
+      const symbol = data.symbol === "X" ? PLAYER_X : PLAYER_O;
+      const opponentSymbol = symbol === PLAYER_X ? PLAYER_O : PLAYER_X;
+      const resumedGrid = INITIAL_GRID.concat();
+      data.moves.forEach(({ ply, position }) => {
+        resumedGrid[position] = ply % 2 === 0 ? PLAYER_X : PLAYER_O;
+      });
+      setGameId(data.game_id);
+      setPlayerSymbol(symbol);
+      opponentSymbolRef.current = opponentSymbol;
+      opponentRef.current = data.opponent;
+      currentTurnRef.current = data.current_turn === data.opponent ? opponentSymbol : symbol;
+      setGrid(resumedGrid);
+      setGameState(GAME_STATES.inProgress);
+      console.log("handleGameResumed");
+    };
+
+    // The server is restarting: reconnect now so the load balancer moves us to
+    // another server, which offers the game back if it was handed off
+    const handleServerDraining = () => {
+      socket.disconnect().connect();
+      console.log("handleServerDraining");
     };
 
     const handleGameJoined = (data: { game_id: string }) => {
@@ -143,8 +186,12 @@ const TicTacToe_multi: React.FC<Props> = ({ squares = INITIAL_GRID }) => {
     socket.on('game_started', handleGameStarted);
     socket.on("move_made", handleMoveMade);
     socket.on('game_over', handleGameOver);
+    socket.on('game_resumable', handleGameResumable);
+    socket.on('game_resumed', handleGameResumed);
+    socket.on('server_draining', handleServerDraining);
 
     socket.on('error', (data) => {
+      resumingRef.current = false;
       setError(data.message);
     });
 
@@ -155,6 +202,9 @@ const TicTacToe_multi: React.FC<Props> = ({ squares = INITIAL_GRID }) => {
       socket.off("game_started");
       socket.off("move_made");
       socket.off("game_over");
+      socket.off("game_resumable");
+      socket.off("game_resumed");
+      socket.off("server_draining");
       socket.off("error");
       socket.close();
     };
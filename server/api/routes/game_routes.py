@@ -1,14 +1,41 @@
+from bson import ObjectId
 from flask import Blueprint, request, jsonify, url_for, session
 import multiplayer_socketIO.events as e
+from models.board import Bitboard
 
 game_bp = Blueprint('game', __name__)
 
+# Largest page a client may ask for
+MAX_PER_PAGE = 100
+
 @game_bp.route('/games', methods=['GET'])
 def get_all_games():
-    page = request.args.get('page', 1, type=int)
-    per_page = request.args.get('per_page', 10, type=int)
+    # Clamped: 0 would leave the cursor page empty and a negative limit means no limit
+    per_page = max(1, min(request.args.get('per_page', 10, type=int), MAX_PER_PAGE))
     username = session.get('username', None)
 
+    # Cursor mode: ?cursor= for the first page, then the returned token
+    cursor = request.args.get('cursor', None)
+    if cursor is not None:
+        include_total = request.args.get('include_total', 'false').lower() == 'true'
+        try:
+            games, next_cursor, total = e.GAMES.get_games_after(username, per_page, cursor, include_total)
+        except ValueError as err:
+            return jsonify({'message': str(err)}), 400
+
+        response = {
+            'games': games,
+            'per_page': per_page,
+            'cursor': next_cursor,
+            'next': url_for('game.get_all_games', cursor=next_cursor, per_page=per_page) if next_cursor else None,
+        }
+        if include_total:
+            response['total'] = total
+        return jsonify(response)
+
+    # Page numbers, kept for existing clients
+    page = max(1, request.args.get('page', 1, type=int))
+
     games, total = e.GAMES.get_all_games_paginated(page, per_page, username)
 
     next_url = url_for('game.get_all_games', page=page + 1, per_page=per_page) if (page * per_page) < total else None
@@ -22,3 +49,45 @@ def get_all_games():
         'next': next_url,
         'back': back_url
     })
+
+
+@game_bp.route('/games/<game_id>/replay', methods=['GET'])
+def get_replay(game_id):
+    """Move log of a game, in play order."""
+    if not ObjectId.is_valid(game_id):
+        return jsonify({'message': 'Invalid game id.'}), 400
+
+    replay = e.GAMES.get_replay(game_id)
+    if replay is None:
+        return jsonify({'message': 'Game not found.'}), 404
+    return jsonify(replay)
+
+
+@game_bp.route('/best_move', methods=['POST'])
+def best_move():
+    """Best move for the side to move on the given board."""
+    data = request.get_json(silent=True)
+    if data is None or not isinstance(data.get('board'), list):
+        return jsonify({'message': 'missing parameters'}), 400
+
+    board = data['board']
+    if any(cell not in ('', 'X', 'O') for cell in board):
+        return jsonify({'message': 'Board cells must be "", "X" or "O".'}), 400
+    try:
+        board = Bitboard.from_list(board)
+    except ValueError as err:
+        return jsonify({'message': str(err)}), 400
+
+    scores = AI.evaluate(board)
+    if not scores:
+        return jsonify({'message': 'Game is over or board is not a legal position.'}), 400
+
+    return jsonify({
+        'position': AI.best_move(board),
+        'best_moves': list(AI.best_moves(board)),
+        'scores': {str(cell): score for cell, score in scores.items()},
+    })
+
+def init_game_routes(ai):
+    global AI
+    AI = ai
@@ -1,4 +1,5 @@
-from flask import jsonify, session, Blueprint
+import json
+from flask import current_app, jsonify, session, Blueprint
 
 
 leaderboard_bp = Blueprint('leaderboard', __name__)
@@ -10,19 +11,18 @@ def get_leaderboard():
     if not username:
         return jsonify({'error': 'Username is required'}), 400
 
-    # Get top 100 players
-    top_players = LEADERBOARD.get_leaderboard(100)
-
     # Get current player stats and rank
     user_stats = LEADERBOARD.get_user_stats(username)
-    user_rank = LEADERBOARD.get_user_rank(username)
-
-    user_stats['rank'] = user_rank
-
-    return jsonify({
-        'top_players': top_players,
-        'current_player': user_stats
-    })
+    if user_stats is None:
+        return jsonify({'error': 'User not found'}), 404
+    user_stats['rank'] = LEADERBOARD.get_user_rank(username)
+
+    # The top 100 players are served from the cached serialized payload
+    body = '{"top_players": %s, "current_player": %s}' % (
+        LEADERBOARD.get_top_payload(),
+        json.dumps(user_stats),
+        )
+    return current_app.response_class(body, mimetype='application/json')
 
 def init_leaderboard_routes(leaderboard):
     global LEADERBOARD
@@ -1,26 +1,47 @@
 # #!/usr/bin/python3
 
+# Green the standard library before anything opens a socket or a lock, so
+# blocking pymongo calls yield to other green threads instead of stalling the
+# hub (gunicorn's eventlet worker does this too; patching twice is harmless).
+import eventlet
+eventlet.monkey_patch()
+
+from bson import ObjectId
 from flask import Flask
 from flask_cors import CORS
-from flask_session import Session
 from datetime import timedelta
 from middleware import auth_middleware
 
 # Import your modules
 from multiplayer_socketIO import socketio
 from models.auth import Auth
+from models.passwords import PasswordHasher
 from models.user import User
 from models.game import Game
 from models.leaderboard import Leaderboard
+from models.settlement import Settlement
+from models.ai import AIEngine, bot_player
+
+def create_app(serve=False):
+    """Build the app; with `serve`, also start this worker's background work.
 
-def create_app():
+    Without it the app is safe for `flask` CLI commands against a live
+    database: no startup cleanup of games, no drain handler and no
+    listeners or sweeper. `create_server` is the entry point that serves.
+    """
     # Import your modules
     from api import auth_bp, user_bp, game_bp, leaderboard_bp, init_api
-    from multiplayer_socketIO.events import init_game_model
+    from multiplayer_socketIO.events import CONNECTIONS, drain, forfeit_game, init_game_model, play_move, start_joined_game, sweep_handoffs
+    from multiplayer_socketIO.scaling import BrokerManager, GameRouter, RankingSync, create_broker
+    from logs import init_logging
+    from metrics import init_metrics, instrument
+    from multiplayer_socketIO.matchmaking import Matchmaker, MatchmakerPool, SkillMatchmaker
     from errors import error
-    from database import init_db
+    from database import POOL, init_db, ensure_indexes, init_db_commands
+    from health import init_health, install_drain_handler
+    from session_store import init_session
     from config import get_config
-    from web_dynamic import web_bp
+    from web_dynamic import web_bp, init_assets
 
     app = Flask(__name__)
     app.secret_key = app.config['SECRET_KEY']
@@ -47,8 +68,9 @@ def create_app():
                 },
         supports_credentials=app.config["CORS_SUPPORTS_CREDENTIALS"].lower() == 'true',
         )
-    app.config['SESSION_TYPE'] = 'filesystem'
-    Session(app)
+
+    # Structured, queued logging for the socket layer
+    init_logging(app.config['LOG_LEVEL'], app.config['LOG_DEBUG_SAMPLE_RATE'], app.config['LOG_QUEUE_SIZE'])
 
     # Register blueprints
     app.register_blueprint(auth_bp, url_prefix='/api/auth')
@@ -58,17 +80,42 @@ def create_app():
     app.register_blueprint(error)
     app.register_blueprint(web_bp)
 
+    # Index the built client once; assets are then served from memory
+    init_assets(app.config['STATIC_MEMORY_MAX_BYTES'])
+
     # Initialize the database
     db = init_db(app)
 
     # Make db available to the app
     app.db = db
+    ensure_indexes(db)
+    init_db_commands(app)
+
+    # Session backend (filesystem, memory, mongodb or cookie)
+    init_session(app)
 
     # Initialize API
-    auth = Auth(app.db)
-    user = User(app.db)
+    hasher = PasswordHasher(
+        rounds=app.config['BCRYPT_ROUNDS'],
+        max_workers=app.config['PASSWORD_HASH_WORKERS'],
+        max_pending=app.config['PASSWORD_HASH_MAX_PENDING'],
+        cache_ttl=app.config['LOGIN_CACHE_TTL'],
+        )
+    auth = Auth(app.db, hasher)
+    user = User(app.db, hasher)
     leaderboard = Leaderboard(app.db)
-    init_api(auth, user, leaderboard)
+    leaderboard.load_ranking()
+    ai = AIEngine()
+    init_api(auth, user, leaderboard, ai)
+
+    # Multi-worker mode: broadcasts, forwarded moves and joins, and ranking changes go through the broker
+    socketio_options = {}
+    router = None
+    if app.config['SOCKETIO_MESSAGE_QUEUE']:
+        broker = create_broker(app.config['SOCKETIO_MESSAGE_QUEUE'])
+        socketio_options['client_manager'] = BrokerManager(broker)
+        router = GameRouter(broker, app.config['WORKER_ID'], app.config['WORKERS'])
+        leaderboard.sync = RankingSync(broker, app.config['WORKER_ID'])
 
     # Initialize SocketIO
     socketio.init_app(
@@ -76,23 +123,85 @@ def create_app():
         manage_session=False,
         cors_allowed_origins=app.config["CORS_CONFIG"]["CORS_ORIGINS"] if app.config["CORS_SUPPORTS_CREDENTIALS"].lower() == 'true' else None,
         cors_credentials=app.config["CORS_SUPPORTS_CREDENTIALS"].lower() == 'true',
+        **socketio_options,
         )
 
     # Initialize Game model
-    game = Game(app.db)
-    init_game_model(game)
-
-    # Delete ongoing or waiting games on server start
-    game.delete_ongoing_or_waiting_games()
+    game = Game(
+        app.db,
+        flush_interval=app.config['LIVE_GAME_FLUSH_INTERVAL'],
+        worker_id=app.config['WORKER_ID'],
+        new_id=router.new_game_id if router else ObjectId,
+        )
+    if app.config['MATCHMAKING_MODE'] == 'skill':
+        matchmaker = MatchmakerPool(lambda: SkillMatchmaker(
+            bucket_width=app.config['MATCHMAKING_BUCKET_WIDTH'],
+            widen_seconds=app.config['MATCHMAKING_WIDEN_SECONDS'],
+            max_wait=app.config['MATCHMAKING_MAX_WAIT'],
+            ))
+    else:
+        matchmaker = MatchmakerPool(Matchmaker)
+    settlement = Settlement(app.db, leaderboard, batch_interval=app.config['SETTLEMENT_BATCH_INTERVAL'])
+    bot_settings = {
+        'backfill_seconds': app.config['BOT_BACKFILL_SECONDS'],
+        'bot_id': bot_player(app.config['BOT_BACKFILL_DIFFICULTY']),
+        'move_delay': app.config['BOT_MOVE_DELAY'],
+    }
+    replay_settings = {
+        'max_delay': app.config['REPLAY_MAX_DELAY'],
+        'max_speed': app.config['REPLAY_MAX_SPEED'],
+    }
+    init_game_model(game, matchmaker, settlement, ai, bot_settings, replay_settings, router)
+
+    # Metrics (off unless METRICS_ENABLED); model methods are only wrapped when on
+    init_metrics(app.config['METRICS_ENABLED'], [
+        ('tictactoe_socket_connections', 'Sockets connected to this worker.', lambda: CONNECTIONS.stats()['connections']),
+        ('tictactoe_active_rooms', 'Game rooms with a player on this worker.', lambda: CONNECTIONS.stats()['active_rooms']),
+        ('tictactoe_spectators', 'Spectating sockets on this worker.', lambda: CONNECTIONS.stats()['spectators']),
+        ('tictactoe_queued_players', 'Players waiting in matchmaking.', lambda: len(matchmaker)),
+        ('tictactoe_matchmaking_oldest_wait_seconds', 'Longest wait of a player still in a matchmaking queue.',
+         lambda: max(stats['oldest_wait_seconds'] for stats in matchmaker.stats().values())),
+        ('tictactoe_matchmaking_max_wait_seconds', 'Longest wait before a pairing since the worker started.',
+         lambda: max(stats['max_wait_seconds'] for stats in matchmaker.stats().values())),
+        ('tictactoe_live_games', 'Games held in memory by this worker.', lambda: len(game.live)),
+        ('tictactoe_password_hash_pending', 'Password operations running or waiting.', lambda: hasher.stats()['pending']),
+        ])
+    if app.config['METRICS_ENABLED']:
+        for model in (auth, user, leaderboard, game, settlement):
+            instrument(model)
 
     # Apply middleware
     auth_middleware(app)
 
+    if serve:
+        # Forwarded work, ranking changes and expired handoffs are handled in the background
+        if router:
+            socketio.start_background_task(router.listen, {'move': play_move, 'join': start_joined_game, 'disconnect': forfeit_game})
+            socketio.start_background_task(leaderboard.sync.listen, leaderboard.ranking)
+        socketio.start_background_task(sweep_handoffs, app.config['HANDOFF_RESUME_SECONDS'], app.config['HANDOFF_SWEEP_INTERVAL'])
+
+        # Readiness probes, and drain on SIGTERM: rooms are handed off before the worker exits
+        init_health(
+            app.db,
+            probes={'mongo_pool': POOL.stats, 'sockets': CONNECTIONS.stats},
+            cache_ttl=app.config['HEALTH_CACHE_SECONDS'],
+            max_loop_lag_ms=app.config['READINESS_MAX_LOOP_LAG_MS'],
+            loop_interval=app.config['LOOP_LAG_INTERVAL'],
+            )
+        install_drain_handler(lambda: drain(app.config['DRAIN_GRACE_SECONDS']), socketio.start_background_task)
+
+        # Delete ongoing or waiting games on server start (only this worker's in multi-worker mode);
+        # games handed off by a draining worker are kept for their players to resume
+        game.delete_ongoing_or_waiting_games(app.config['WORKER_ID'] if router else None, app.config['HANDOFF_RESUME_SECONDS'])
+
     return app
 
-app = create_app()
+def create_server():
+    """The app as served by gunicorn (`app:create_server()`) or `python app.py`."""
+    return create_app(serve=True)
 
 if __name__ == '__main__':
+    app = create_server()
     # app.run(host="127.0.0.1", port="3000", debug=True)
     socketio.run(
         app,
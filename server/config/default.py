@@ -1,4 +1,5 @@
 import os
+import socket
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,3 +11,86 @@ class BaseConfig:
     CORS_SUPPORTS_CREDENTIALS = os.getenv("CORS_SUPPORTS_CREDENTIALS", 'false')
     SAMESITE_POLICY = os.getenv("SESSION_COOKIE_SAMESITE", 'Lax')
     MONGO_URI = os.getenv("MONGO_URI", None)
+
+    # Mongo connection pool: connections per worker and how long a query may wait for one
+    MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", 50))
+    MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", 0))
+    MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", 2000))
+    # Mongo timeouts in milliseconds; a stuck query fails instead of holding its green thread
+    MONGO_CONNECT_TIMEOUT_MS = int(os.getenv("MONGO_CONNECT_TIMEOUT_MS", 5000))
+    MONGO_SERVER_SELECTION_TIMEOUT_MS = int(os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", 5000))
+    MONGO_SOCKET_TIMEOUT_MS = int(os.getenv("MONGO_SOCKET_TIMEOUT_MS", 10000))
+    # Queries slower than this many milliseconds are logged (0 disables)
+    MONGO_SLOW_QUERY_MS = float(os.getenv("MONGO_SLOW_QUERY_MS", 100))
+
+    # Static files up to this size are held in memory, with precompressed variants
+    STATIC_MEMORY_MAX_BYTES = int(os.getenv("STATIC_MEMORY_MAX_BYTES", 512 * 1024))
+
+    # bcrypt cost factor for new password hashes (each +1 doubles the work)
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 12))
+    # Password hashes run on this many OS threads; beyond PENDING queued calls, requests get a 503
+    PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", 4))
+    PASSWORD_HASH_MAX_PENDING = int(os.getenv("PASSWORD_HASH_MAX_PENDING", 64))
+    # Seconds a verified login is remembered so repeated logins skip bcrypt (0 disables)
+    LOGIN_CACHE_TTL = float(os.getenv("LOGIN_CACHE_TTL", 60))
+
+    # Socket layer logging: level, fraction of DEBUG records kept, and records buffered before dropping
+    LOG_LEVEL = os.getenv("LOG_LEVEL", 'INFO').upper()
+    LOG_DEBUG_SAMPLE_RATE = float(os.getenv("LOG_DEBUG_SAMPLE_RATE", 1))
+    LOG_QUEUE_SIZE = int(os.getenv("LOG_QUEUE_SIZE", 10000))
+
+    # Collect Prometheus-style metrics and serve them at /metrics
+    METRICS_ENABLED = os.getenv("METRICS_ENABLED", 'false').lower() == 'true'
+    # Bearer token a scraper must send to read /metrics; without it only METRICS_ALLOWED_IPS may
+    METRICS_TOKEN = os.getenv("METRICS_TOKEN", '')
+    # Client addresses allowed to read /metrics without the token (comma-separated)
+    METRICS_ALLOWED_IPS = frozenset(ip.strip() for ip in os.getenv("METRICS_ALLOWED_IPS", "127.0.0.1,::1").split(',') if ip.strip())
+
+    # Readiness (/readyz): seconds a result is reused, and event loop lag in milliseconds above which the worker is not ready
+    HEALTH_CACHE_SECONDS = float(os.getenv("HEALTH_CACHE_SECONDS", 1))
+    READINESS_MAX_LOOP_LAG_MS = float(os.getenv("READINESS_MAX_LOOP_LAG_MS", 1000))
+    # Seconds between event loop lag samples
+    LOOP_LAG_INTERVAL = float(os.getenv("LOOP_LAG_INTERVAL", 0.5))
+    # Seconds a worker keeps serving after SIGTERM so players can move to another worker
+    DRAIN_GRACE_SECONDS = float(os.getenv("DRAIN_GRACE_SECONDS", 10))
+    # Seconds a handed-off game waits for its players to resume it before it is discarded
+    HANDOFF_RESUME_SECONDS = float(os.getenv("HANDOFF_RESUME_SECONDS", 120))
+    # Seconds between sweeps that discard or forfeit handed-off games past HANDOFF_RESUME_SECONDS
+    HANDOFF_SWEEP_INTERVAL = float(os.getenv("HANDOFF_SWEEP_INTERVAL", 15))
+
+    # Seconds between write-behind flushes of in-progress games
+    LIVE_GAME_FLUSH_INTERVAL = float(os.getenv("LIVE_GAME_FLUSH_INTERVAL", 0.5))
+
+    # Matchmaking: 'fifo' pairs by arrival, 'skill' pairs by leaderboard score
+    MATCHMAKING_MODE = os.getenv("MATCHMAKING_MODE", 'fifo').lower()
+    MATCHMAKING_BUCKET_WIDTH = int(os.getenv("MATCHMAKING_BUCKET_WIDTH", 10))
+    MATCHMAKING_WIDEN_SECONDS = float(os.getenv("MATCHMAKING_WIDEN_SECONDS", 5))
+    MATCHMAKING_MAX_WAIT = float(os.getenv("MATCHMAKING_MAX_WAIT", 30))
+
+    # Seconds over which finished games are coalesced into one stats write (0 settles each game immediately)
+    SETTLEMENT_BATCH_INTERVAL = float(os.getenv("SETTLEMENT_BATCH_INTERVAL", 0))
+
+    # Multi-worker mode: broker URL for room broadcasts and move forwarding
+    # (redis://host:6379/0, or local:// for in-process tests). Unset = single worker.
+    SOCKETIO_MESSAGE_QUEUE = os.getenv("SOCKETIO_MESSAGE_QUEUE", None)
+    # Stable identity of this worker; games it creates are owned by it
+    WORKER_ID = os.getenv("WORKER_ID", socket.gethostname())
+    # Comma-separated WORKER_IDs of every worker sharing the message queue; games are sharded over them
+    WORKERS = [worker for worker in os.getenv("WORKERS", "").split(',') if worker] or [WORKER_ID]
+
+    # Session storage: filesystem, memory, mongodb (shared, with a local LRU tier) or cookie
+    SESSION_BACKEND = os.getenv("SESSION_BACKEND", 'filesystem').lower()
+    SESSION_CACHE_SIZE = int(os.getenv("SESSION_CACHE_SIZE", 10000))
+    SESSION_CACHE_TTL = int(os.getenv("SESSION_CACHE_TTL", 60))
+
+    # Seconds a player waits for a human opponent before a bot takes the seat; off (0) unless set
+    BOT_BACKFILL_SECONDS = float(os.getenv("BOT_BACKFILL_SECONDS", 0))
+    # Difficulty of backfill bots: easy, medium or hard
+    BOT_BACKFILL_DIFFICULTY = os.getenv("BOT_BACKFILL_DIFFICULTY", 'medium').lower()
+    # Seconds a bot waits before answering a move
+    BOT_MOVE_DELAY = float(os.getenv("BOT_MOVE_DELAY", 0.5))
+
+    # Longest pause between two replayed moves, in seconds at 1x speed
+    REPLAY_MAX_DELAY = float(os.getenv("REPLAY_MAX_DELAY", 2))
+    # Fastest playback speed a client may ask for
+    REPLAY_MAX_SPEED = float(os.getenv("REPLAY_MAX_SPEED", 16))
@@ -11,6 +11,8 @@ class DevelopmentConfig(BaseConfig):
         raise ValueError("No APP_PORT set for Flask application")
 
     DEBUG = os.getenv("DEBUG", True)
+    # Cheaper hashes keep local logins and test registrations fast
+    BCRYPT_ROUNDS = int(os.getenv("BCRYPT_ROUNDS", 10))
     SECRET_KEY = os.getenv("SECRET_KEY", "Flask-tic_tac_toe")
     CORS_CONFIG = {
         'CORS_ORIGINS' : os.getenv("CORS_ORIGINS", '*').split(','),
@@ -1,7 +1,277 @@
-from pymongo import MongoClient
+import logging
+import threading
+import click
+from logs import get_logger, log_event
+from metrics import METRICS
+from pymongo import MongoClient, IndexModel, UpdateOne, ASCENDING, DESCENDING, monitoring
+from pymongo.errors import OperationFailure
+
+LOG = get_logger('database')
+
+# Indexes backing every query issued by the models, per collection.
+INDEXES = {
+    'users': [
+        IndexModel([('username', ASCENDING)], unique=True, name='username_unique'),
+        IndexModel([('email', ASCENDING)], unique=True, name='email_unique'),
+    ],
+    'games': [
+        IndexModel([('players.player1', ASCENDING), ('status', ASCENDING)], name='player1_status'),
+        IndexModel([('players.player2', ASCENDING), ('status', ASCENDING)], name='player2_status'),
+        IndexModel([('status', ASCENDING), ('created_at', ASCENDING)], name='status_created_at'),
+        IndexModel([('players.player1', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='player1_history'),
+        IndexModel([('players.player2', ASCENDING), ('created_at', DESCENDING), ('_id', DESCENDING)], name='player2_history'),
+    ],
+    'leaderboard': [
+        IndexModel([('username', ASCENDING)], unique=True, name='username_unique'),
+        IndexModel([('score', DESCENDING)], name='score_desc'),
+    ],
+}
+
+# (name, collection, filter, sort) of the model queries checked by `flask audit-indexes`.
+AUDITED_QUERIES = [
+    ('Auth/User by username', 'users', {'username': ''}, None),
+    ('Auth/User by email', 'users', {'email': ''}, None),
+    ('Leaderboard.get_user_stats', 'leaderboard', {'username': ''}, None),
+    ('Leaderboard.get_leaderboard', 'leaderboard', {}, [('score', DESCENDING)]),
+    ('Leaderboard.get_user_rank', 'leaderboard', {'score': {'$gt': 0}}, None),
+    ('Game.search_games_by_status', 'games', {'status': 'waiting'}, [('created_at', ASCENDING)]),
+    ('Game.search_games_by_player_and_status', 'games', {
+        '$and': [
+            {'$or': [{'players.player1': ''}, {'players.player2': ''}]},
+            {'status': {'$in': ['waiting', 'ongoing']}}
+        ]
+    }, None),
+    ('Game.get_all_games_paginated', 'games', {'$or': [{'players.player1': ''}, {'players.player2': ''}]}, None),
+    ('Game.get_games_after', 'games', {'$or': [{'players.player1': ''}, {'players.player2': ''}]}, [('created_at', DESCENDING), ('_id', DESCENDING)]),
+    ('Game.delete_ongoing_or_waiting_games', 'games', {'status': {'$in': ['waiting', 'ongoing']}}, None),
+]
+
+
+MONGO_COMMAND_LATENCY = METRICS.histogram(
+    'tictactoe_mongo_command_seconds', 'Latency of every Mongo command, by command and collection.',
+    ('command', 'collection'))
+MONGO_COMMAND_FAILURES = METRICS.counter(
+    'tictactoe_mongo_command_failures_total', 'Mongo commands that failed, by command and collection.',
+    ('command', 'collection'))
+
+
+class QueryLatencyListener(monitoring.CommandListener):
+    """Latency of every Mongo command, per `(command, collection)`.
+
+    Registered on the `MongoClient`, so every model query is measured without
+    touching the models. The histograms are served at `/metrics`; commands
+    slower than `slow_ms` are logged.
+    """
+
+    def __init__(self, slow_ms=0):
+        self.slow_ms = slow_ms
+        self._collections = {}
+
+    def started(self, event):
+        collection = event.command.get(event.command_name)
+        self._collections[event.request_id] = collection if isinstance(collection, str) else ''
+
+    def succeeded(self, event):
+        self._record(event)
+
+    def failed(self, event):
+        collection = self._record(event)
+        MONGO_COMMAND_FAILURES.inc(event.command_name, collection)
+
+    def _record(self, event):
+        collection = self._collections.pop(event.request_id, '')
+        seconds = event.duration_micros / 1_000_000
+        MONGO_COMMAND_LATENCY.observe(seconds, event.command_name, collection)
+        if self.slow_ms and seconds * 1000 >= self.slow_ms:
+            log_event(LOG, logging.WARNING, 'slow_mongo_query', command=event.command_name,
+                      collection=collection, ms=round(seconds * 1000, 1))
+        return collection
+
+
+class PoolMonitor(monitoring.ConnectionPoolListener):
+    """Connections checked out of the pool and queries waiting for one.
+
+    Counts are summed over every server's pool, so `saturation` is the share
+    of `max_size` in use on a standalone server or a replica set primary.
+    """
+
+    def __init__(self, max_size=100):
+        self.max_size = max_size
+        self.checked_out = 0
+        self.waiting = 0
+        self.wait_timeouts = 0
+        self._lock = threading.Lock()
+
+    def connection_check_out_started(self, event):
+        with self._lock:
+            self.waiting += 1
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.waiting -= 1
+            self.checked_out += 1
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.waiting -= 1
+            if event.reason == monitoring.ConnectionCheckOutFailedReason.TIMEOUT:
+                self.wait_timeouts += 1
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_out -= 1
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        pass
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        pass
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        pass
+
+    def stats(self):
+        return {
+            'max_size': self.max_size,
+            'checked_out': self.checked_out,
+            'waiting': self.waiting,
+            'saturation': round(self.checked_out / self.max_size, 3) if self.max_size else 0.0,
+            'wait_timeouts': self.wait_timeouts,
+        }
+
+
+# Latency of every command issued through the client created by `init_db`
+QUERY_LATENCY = QueryLatencyListener()
+# Pool usage of that client
+POOL = PoolMonitor()
+
 
 def init_db(app):
-    client = MongoClient(app.config['MONGO_URI'])
+    """Connect with an explicitly sized pool and bounded timeouts.
+
+    The app runs on eventlet with the standard library monkey-patched (see
+    `app.py`), so pymongo's sockets and pool locks are green: a query waiting
+    on the server parks only its own green thread and the hub keeps serving
+    other rooms. The pool caps concurrent queries per worker, the wait queue
+    timeout bounds how long a burst can queue for a connection, and the
+    socket timeout bounds how long one slow query can hold its connection.
+    """
+    QUERY_LATENCY.slow_ms = app.config['MONGO_SLOW_QUERY_MS']
+    POOL.max_size = app.config['MONGO_MAX_POOL_SIZE']
+    client = MongoClient(
+        app.config['MONGO_URI'],
+        maxPoolSize=app.config['MONGO_MAX_POOL_SIZE'],
+        minPoolSize=app.config['MONGO_MIN_POOL_SIZE'],
+        waitQueueTimeoutMS=app.config['MONGO_WAIT_QUEUE_TIMEOUT_MS'],
+        connectTimeoutMS=app.config['MONGO_CONNECT_TIMEOUT_MS'],
+        serverSelectionTimeoutMS=app.config['MONGO_SERVER_SELECTION_TIMEOUT_MS'],
+        socketTimeoutMS=app.config['MONGO_SOCKET_TIMEOUT_MS'],
+        event_listeners=[QUERY_LATENCY, POOL],
+    )
     db = client[app.config['MONGO_DB_NAME']]
 
     return db
+
+
+def ensure_indexes(db):
+    """Create any missing index from `INDEXES`; existing ones are left alone."""
+    for collection, indexes in INDEXES.items():
+        try:
+            db[collection].create_indexes(indexes)
+        except OperationFailure as e:
+            log_event(LOG, logging.WARNING, 'index_creation_failed', collection=collection, error=str(e))
+
+
+def _stages(plan):
+    """Yield every stage name in an explain() plan tree."""
+    if isinstance(plan, dict):
+        if 'stage' in plan:
+            yield plan['stage']
+        for value in plan.values():
+            yield from _stages(value)
+    elif isinstance(plan, list):
+        for value in plan:
+            yield from _stages(value)
+
+
+def audit_query_plans(db):
+    """Explain each audited query, returning `(name, stages)` for collection scans."""
+    failures = []
+    for name, collection, query, sort in AUDITED_QUERIES:
+        cursor = db[collection].find(query)
+        if sort:
+            cursor = cursor.sort(sort)
+        plan = cursor.limit(1).explain()
+        stages = list(_stages(plan['queryPlanner']['winningPlan']))
+        if 'COLLSCAN' in stages:
+            failures.append((name, stages))
+    return failures
+
+
+def legacy_moves(board, played_at):
+    """Synthesize a move log for a board stored before moves were recorded.
+
+    The real order is unknown, so X and O cells are interleaved in cell order
+    and every move is stamped with `played_at`. Returns None for a board no
+    legal game could reach.
+    """
+    x_cells = [cell for cell, symbol in enumerate(board) if symbol == 'X']
+    o_cells = [cell for cell, symbol in enumerate(board) if symbol == 'O']
+    if not len(o_cells) <= len(x_cells) <= len(o_cells) + 1:
+        return None
+    cells = []
+    for ply in range(len(x_cells) + len(o_cells)):
+        cells.append(x_cells[ply // 2] if ply % 2 == 0 else o_cells[ply // 2])
+    return [{'c': cell, 'p': ply, 't': played_at} for ply, cell in enumerate(cells)]
+
+
+def migrate_move_logs(db, batch_size=500):
+    """Add a `moves` log to every game stored with only a `board` array.
+
+    Returns the number of games migrated and of games skipped as illegal.
+    """
+    games = db['games']
+    migrated = skipped = 0
+    batch = []
+    for game in games.find({'moves': {'$exists': False}}, {'board': 1, 'created_at': 1}):
+        moves = legacy_moves(game.get('board') or [], game.get('created_at'))
+        if moves is None:
+            skipped += 1
+            continue
+        batch.append(UpdateOne({'_id': game['_id'], 'moves': {'$exists': False}}, {'$set': {'moves': moves}}))
+        if len(batch) >= batch_size:
+            migrated += games.bulk_write(batch, ordered=False).modified_count
+            batch = []
+    if batch:
+        migrated += games.bulk_write(batch, ordered=False).modified_count
+    return migrated, skipped
+
+
+def init_db_commands(app):
+    @app.cli.command('migrate-move-logs')
+    def migrate_moves():
+        """Backfill the move log of games stored before moves were recorded."""
+        migrated, skipped = migrate_move_logs(app.db)
+        click.echo(f'Migrated {migrated} games, skipped {skipped} with an illegal board.')
+
+    @app.cli.command('audit-indexes')
+    def audit_indexes():
+        """Fail if any model query falls back to a COLLSCAN."""
+        failures = audit_query_plans(app.db)
+        for name, stages in failures:
+            click.echo(f'COLLSCAN: {name} ({" -> ".join(stages)})', err=True)
+        if failures:
+            raise SystemExit(1)
+        click.echo(f'All {len(AUDITED_QUERIES)} model queries use an index.')
@@ -1,5 +1,6 @@
 """Module for handling error codes in the application."""
 from flask import Blueprint, jsonify, Response
+from models.passwords import PasswordHasherBusy
 
 error = Blueprint('errors', __name__)
 
@@ -57,3 +58,17 @@ def forbidden(error) -> Response:
         A JSON response with the error message and the HTTP status code.
     """
     return jsonify({"error": "Forbidden"}), 403
+
+
+@error.app_errorhandler(PasswordHasherBusy)
+def password_hasher_busy(error) -> Response:
+    """
+    Handle a login, registration or password change shed under load.
+
+    Args:
+        error: The error object.
+
+    Returns:
+        A JSON response with the error message, a Retry-After header and the HTTP status code.
+    """
+    return jsonify({"error": str(error)}), 503, {"Retry-After": "1"}
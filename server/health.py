@@ -0,0 +1,146 @@
+"""
+Liveness and readiness of this worker, for `/livez` and `/readyz`.
+
+Liveness only says the process answers. Readiness says whether the load
+balancer should send it players: it times a Mongo ping and reports pool
+saturation, event-loop lag and live sockets. The result is cached for
+`cache_ttl` seconds so probes from several balancers cost one ping, and a
+draining worker reports not ready immediately.
+"""
+import os
+import signal
+import threading
+import time
+
+
+class LoopLagMonitor:
+    """Measures how late the event loop wakes a sleeping green thread.
+
+    With the standard library monkey-patched, `time.sleep` yields to the
+    hub, so the overshoot past `interval` is how long other green threads
+    kept it busy. `max_lag_ms` is the worst lag since the last readiness check.
+    """
+
+    def __init__(self, interval=0.5):
+        self.interval = interval
+        self.lag_ms = 0.0
+        self.max_lag_ms = 0.0
+        self._thread = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='loop-lag-monitor', daemon=True)
+            self._thread.start()
+        return self
+
+    def _run(self):
+        while True:
+            started = time.monotonic()
+            time.sleep(self.interval)
+            self.lag_ms = max(0.0, (time.monotonic() - started - self.interval) * 1000)
+            self.max_lag_ms = max(self.max_lag_ms, self.lag_ms)
+
+    def stats(self):
+        stats = {'lag_ms': round(self.lag_ms, 1), 'max_lag_ms': round(self.max_lag_ms, 1)}
+        self.max_lag_ms = self.lag_ms
+        return stats
+
+
+class HealthCheck:
+    """Cached readiness report built from dependency probes.
+
+    `probes` maps a report key to a callable returning that section; they
+    are cheap in-memory reads. The Mongo ping is the only network call and
+    only one caller refreshes at a time, others get the cached report.
+    """
+
+    def __init__(self, db, loop_lag, probes=None, cache_ttl=1.0, max_loop_lag_ms=1000):
+        self.db = db
+        self.loop_lag = loop_lag
+        self.probes = probes or {}
+        self.cache_ttl = cache_ttl
+        self.max_loop_lag_ms = max_loop_lag_ms
+        self.draining = False
+        self._report = None
+        self._expires_at = 0.0
+        self._refresh = threading.Lock()
+
+    def ping_mongo(self):
+        started = time.perf_counter()
+        try:
+            self.db.command('ping')
+        except Exception as e:
+            return {'ok': False, 'error': str(e), 'ping_ms': round((time.perf_counter() - started) * 1000, 1)}
+        return {'ok': True, 'ping_ms': round((time.perf_counter() - started) * 1000, 1)}
+
+    def ready(self):
+        """`(ready, report)`, refreshed at most once per `cache_ttl` seconds."""
+        if self.draining:
+            return False, {'status': 'draining'}
+        report = self._report
+        if report is None or time.monotonic() >= self._expires_at:
+            if self._refresh.acquire(blocking=report is None):
+                try:
+                    if self._report is None or time.monotonic() >= self._expires_at:
+                        self._report = self._build()
+                        self._expires_at = time.monotonic() + self.cache_ttl
+                    report = self._report
+                finally:
+                    self._refresh.release()
+        return report['status'] == 'ready', report
+
+    def _build(self):
+        mongo = self.ping_mongo()
+        loop = self.loop_lag.stats()
+        report = {'mongo': mongo, 'event_loop': loop}
+        for name, probe in self.probes.items():
+            report[name] = probe()
+
+        problems = []
+        if not mongo['ok']:
+            problems.append('mongo_unreachable')
+        if loop['max_lag_ms'] > self.max_loop_lag_ms:
+            problems.append('event_loop_lagging')
+        report['status'] = 'not_ready' if problems else 'ready'
+        if problems:
+            report['problems'] = problems
+        report['checked_at'] = round(time.time(), 3)
+        return report
+
+
+# Set up by `init_health`; the drain sets `HEALTH.draining`
+HEALTH = None
+
+
+def init_health(db, probes=None, cache_ttl=1.0, max_loop_lag_ms=1000, loop_interval=0.5):
+    global HEALTH
+    HEALTH = HealthCheck(db, LoopLagMonitor(loop_interval).start(), probes, cache_ttl, max_loop_lag_ms)
+    return HEALTH
+
+
+def install_drain_handler(drain, spawn, signum=signal.SIGTERM):
+    """Drain on `signum`, then hand the signal to the handler it replaced.
+
+    The handler only spawns `drain` on a green thread; once it returns the
+    previous handler (gunicorn's graceful exit, or the default) is restored
+    and the signal raised again. A second signal while draining skips ahead.
+    """
+    previous = signal.getsignal(signum)
+
+    def exit_now():
+        signal.signal(signum, previous if previous is not None else signal.SIG_DFL)
+        os.kill(os.getpid(), signum)
+
+    def drain_then_exit():
+        try:
+            drain()
+        finally:
+            exit_now()
+
+    def handle(signum, frame):
+        if HEALTH is not None and HEALTH.draining:
+            exit_now()
+        else:
+            spawn(drain_then_exit)
+
+    signal.signal(signum, handle)
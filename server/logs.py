@@ -0,0 +1,141 @@
+"""Structured, non-blocking logging for the whole server.
+
+Handlers only put the record on a bounded queue; a listener on a real OS
+thread formats it as one JSON line and writes it to stdout, so neither
+formatting nor the blocking write runs on the eventlet hub. When the queue
+is full records are dropped (and counted) rather than making a socket
+handler wait, and debug records can be sampled. Hot paths call `log_event`
+behind an `isEnabledFor` check, so with debug logging off a move builds no
+fields at all.
+"""
+import json
+import logging
+import queue
+import random
+import sys
+import threading
+import time
+from logging.handlers import QueueHandler, QueueListener
+
+try:
+    from eventlet import patcher
+except ImportError:  # Scripts and tools that run without eventlet
+    patcher = None
+
+# The unpatched modules: after monkey-patching, `threading.Thread` would be a
+# green thread on the hub, and a green queue cannot be waited on from an OS thread.
+_threading = patcher.original('threading') if patcher else threading
+_queue = patcher.original('queue') if patcher else queue
+
+ROOT = 'tictactoe'
+
+
+def get_logger(name):
+    return logging.getLogger(f'{ROOT}.{name}')
+
+
+def log_event(logger, level, event, **fields):
+    """Log `event` with structured `fields`; a no-op below the logger's level."""
+    if logger.isEnabledFor(level):
+        logger.log(level, event, extra={'fields': fields})
+
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line: time, level, logger, event and its fields."""
+
+    def format(self, record):
+        entry = {
+            'ts': round(record.created, 3),
+            'level': record.levelname,
+            'logger': record.name,
+            'event': record.getMessage(),
+        }
+        entry.update(getattr(record, 'fields', None) or {})
+        if record.exc_info:
+            entry['exc'] = self.formatException(record.exc_info)
+        return json.dumps(entry, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keeps only a `rate` fraction of records at or below `max_level`."""
+
+    def __init__(self, rate=1.0, max_level=logging.DEBUG):
+        super().__init__()
+        self.rate = rate
+        self.max_level = max_level
+
+    def filter(self, record):
+        return record.levelno > self.max_level or self.rate >= 1 or random.random() < self.rate
+
+
+class DroppingQueueHandler(QueueHandler):
+    """Queue handler that drops records instead of blocking when the queue is full."""
+
+    def __init__(self, maxsize=10000):
+        super().__init__(_queue.Queue(maxsize))
+        self.dropped = 0
+
+    def prepare(self, record):
+        # Formatting is left to the listener, off the caller's path
+        return record
+
+    def enqueue(self, record):
+        try:
+            self.queue.put_nowait(record)
+        except _queue.Full:
+            self.dropped += 1
+
+    def stats(self):
+        return {'queued': self.queue.qsize(), 'dropped': self.dropped}
+
+
+class ThreadQueueListener(QueueListener):
+    """`QueueListener` whose worker is an OS thread even with the standard library green."""
+
+    def start(self):
+        self._thread = _threading.Thread(target=self._monitor, name='log-listener', daemon=True)
+        self._thread.start()
+
+
+class DropReporter(logging.Handler):
+    """Listener-side handler that reports records dropped since the last report."""
+
+    def __init__(self, queue_handler, target, interval=10.0):
+        super().__init__()
+        self.queue_handler = queue_handler
+        self.target = target
+        self.interval = interval
+        self._reported = 0
+        self._last = 0.0
+
+    def emit(self, record):
+        dropped = self.queue_handler.dropped
+        now = time.monotonic()
+        if dropped > self._reported and now - self._last >= self.interval:
+            self.target.handle(logging.makeLogRecord({
+                'name': ROOT, 'levelno': logging.WARNING, 'levelname': 'WARNING',
+                'msg': 'log_records_dropped', 'fields': {'dropped': dropped - self._reported},
+            }))
+            self._reported, self._last = dropped, now
+
+
+QUEUE_HANDLER = None
+
+
+def init_logging(level='INFO', debug_sample_rate=1.0, queue_size=10000, stream=None):
+    """Route every `tictactoe.*` logger through one bounded queue to JSON on stdout."""
+    global QUEUE_HANDLER
+    logger = logging.getLogger(ROOT)
+    logger.setLevel(level)
+    logger.propagate = False
+    if QUEUE_HANDLER is not None:
+        return QUEUE_HANDLER
+
+    QUEUE_HANDLER = DroppingQueueHandler(queue_size)
+    QUEUE_HANDLER.addFilter(SamplingFilter(debug_sample_rate))
+    output = logging.StreamHandler(stream or sys.stdout)
+    output.setFormatter(JsonFormatter())
+    listener = ThreadQueueListener(QUEUE_HANDLER.queue, output, DropReporter(QUEUE_HANDLER, output))
+    listener.start()
+    logger.addHandler(QUEUE_HANDLER)
+    return QUEUE_HANDLER
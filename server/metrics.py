@@ -0,0 +1,206 @@
+"""
+Prometheus-style instrumentation exposed at `/metrics`.
+
+Metrics are module-level objects updated from the hot paths. Everything is
+off unless `METRICS_ENABLED` is set: updates then return after one flag
+check, timers do not read the clock, and model methods are only wrapped by
+`instrument` when enabled.
+"""
+import bisect
+import functools
+import threading
+import time
+
+# Latency buckets in seconds, from sub-millisecond in-memory work to slow queries
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+
+def _labels(names, values):
+    if not names:
+        return ''
+    pairs = ','.join(f'{name}="{str(value)}"' for name, value in zip(names, values))
+    return '{' + pairs + '}'
+
+
+class Metric:
+    kind = 'untyped'
+
+    def __init__(self, registry, name, help, labels=()):
+        self.registry = registry
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+
+    def header(self):
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} {self.kind}']
+
+
+class Counter(Metric):
+    kind = 'counter'
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.values = {}
+
+    def inc(self, *labels, amount=1):
+        if self.registry.enabled:
+            self.values[labels] = self.values.get(labels, 0) + amount
+
+    def render(self):
+        return self.header() + [
+            f'{self.name}{_labels(self.label_names, labels)} {value}' for labels, value in self.values.items()
+        ]
+
+
+class Gauge(Metric):
+    """A value set by the code, or read from `callback()` at scrape time."""
+
+    kind = 'gauge'
+
+    def __init__(self, registry, name, help, labels=(), callback=None):
+        super().__init__(registry, name, help, labels)
+        self.callback = callback
+        self.values = {}
+
+    def set(self, value, *labels):
+        if self.registry.enabled:
+            self.values[labels] = value
+
+    def render(self):
+        values = self.values
+        if self.callback is not None:
+            try:
+                values = {(): self.callback()}
+            except Exception:
+                values = {}
+        return self.header() + [
+            f'{self.name}{_labels(self.label_names, labels)} {value}' for labels, value in values.items()
+        ]
+
+
+class Histogram(Metric):
+    kind = 'histogram'
+
+    def __init__(self, registry, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        super().__init__(registry, name, help, labels)
+        self.buckets = tuple(buckets)
+        # labels -> [bucket counts..., +Inf count, sum]
+        self.series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        if not self.registry.enabled:
+            return
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self.series.get(labels)
+            if series is None:
+                series = self.series[labels] = [0] * (len(self.buckets) + 1) + [0.0]
+            series[index] += 1
+            series[-1] += value
+
+    def time(self, *labels):
+        return _Timer(self, labels)
+
+    def render(self):
+        lines = self.header()
+        with self._lock:
+            series = {labels: list(values) for labels, values in self.series.items()}
+        for labels, values in series.items():
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), values):
+                cumulative += count
+                le = _labels(self.label_names + ('le',), labels + (bound,))
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            lines.append(f'{self.name}_sum{_labels(self.label_names, labels)} {values[-1]}')
+            lines.append(f'{self.name}_count{_labels(self.label_names, labels)} {cumulative}')
+        return lines
+
+
+class _Timer:
+    __slots__ = ('histogram', 'labels', 'started')
+
+    def __init__(self, histogram, labels):
+        self.histogram = histogram
+        self.labels = labels
+
+    def __enter__(self):
+        self.started = time.perf_counter() if self.histogram.registry.enabled else None
+        return self
+
+    def __exit__(self, *exc):
+        if self.started is not None:
+            self.histogram.observe(time.perf_counter() - self.started, *self.labels)
+
+
+class Registry:
+    def __init__(self):
+        self.enabled = False
+        self.metrics = []
+
+    def _add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def counter(self, name, help, labels=()):
+        return self._add(Counter(self, name, help, labels))
+
+    def gauge(self, name, help, labels=(), callback=None):
+        return self._add(Gauge(self, name, help, labels, callback))
+
+    def histogram(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        return self._add(Histogram(self, name, help, labels, buckets))
+
+    def render(self):
+        """Every metric in the Prometheus text exposition format."""
+        lines = []
+        for metric in self.metrics:
+            lines.extend(metric.render())
+        return '\n'.join(lines) + '\n'
+
+
+METRICS = Registry()
+
+MOVE_LATENCY = METRICS.histogram(
+    'tictactoe_move_seconds', 'Time spent handling a move, by phase.', ('phase',))
+MODEL_CALL_LATENCY = METRICS.histogram(
+    'tictactoe_model_call_seconds', 'Latency of model methods, which wrap the Mongo calls.', ('method',))
+PASSWORD_HASH_LATENCY = METRICS.histogram(
+    'tictactoe_password_hash_seconds', 'Time spent in bcrypt, by operation.', ('operation',),
+    buckets=(0.01, 0.025, 0.05, 0.1, 0.2, 0.3, 0.5, 1.0, 2.5))
+MATCHMAKING_WAIT = METRICS.histogram(
+    'tictactoe_matchmaking_wait_seconds', 'Time paired players waited in the matchmaking queue.', ('variant',),
+    buckets=(0.5, 1.0, 2.5, 5.0, 10.0, 15.0, 20.0, 30.0, 45.0, 60.0, 120.0))
+SOCKET_EVENTS = METRICS.counter(
+    'tictactoe_socket_events_total', 'Socket connects and disconnects.', ('event',))
+
+
+def instrument(model, name=None):
+    """Time every public method of a model instance in `MODEL_CALL_LATENCY`."""
+    name = name or type(model).__name__
+    for attribute, value in vars(type(model)).items():
+        if attribute.startswith('_') or not callable(value) or isinstance(value, (staticmethod, classmethod)):
+            continue
+        setattr(model, attribute, _timed(getattr(model, attribute), f'{name}.{attribute}'))
+    return model
+
+
+def _timed(method, label):
+    @functools.wraps(method)
+    def timed(*args, **kwargs):
+        started = time.perf_counter()
+        try:
+            return method(*args, **kwargs)
+        finally:
+            MODEL_CALL_LATENCY.observe(time.perf_counter() - started, label)
+    return timed
+
+
+def init_metrics(enabled, gauges=()):
+    """Turn collection on or off and register scrape-time gauges.
+
+    `gauges` is an iterable of `(name, help, callback)`.
+    """
+    METRICS.enabled = enabled
+    for name, help, callback in gauges:
+        METRICS.gauge(name, help, callback=callback)
@@ -3,38 +3,84 @@ This to implement middleware related function like protect specific routes,
 or check every request have valid session or not, and rate limiting
 features if needed.
 """
+import os
 from flask import request, session, jsonify, redirect, url_for
+from flask.sessions import SessionInterface
+
+# Endpoints that don't require authentication
+OPEN_ENDPOINTS = frozenset({
+    # Web routes
+    'web_dynamic.register',
+    'web_dynamic.login',
+    'web_dynamic.ttt_ai',
+    'web_dynamic.tictactoe',
+    'web_dynamic.home',
+    'web_dynamic.status',
+    'web_dynamic.metrics',
+    'web_dynamic.modes',
+    # API routes
+    'auth.register',
+    'auth.login',
+})
+
+# Path prefixes served without a session: bundled assets and health probes. Socket.IO is not one of
+# them: with `manage_session=False` every event reads the Flask session through its request context.
+FAST_LANE_PREFIXES = ('/assets/', '/livez', '/readyz')
+
+
+class FastLane:
+    """Paths that need neither authentication nor a session, fixed at startup."""
+
+    def __init__(self, static_folder=None, prefixes=FAST_LANE_PREFIXES):
+        self.prefixes = prefixes
+        # Top-level files of the web build (favicon, manifest, ...)
+        names = os.listdir(static_folder) if static_folder and os.path.isdir(static_folder) else ()
+        self.static_files = frozenset('/' + name for name in names if os.path.isfile(os.path.join(static_folder, name)))
+
+    def __contains__(self, path):
+        return path.startswith(self.prefixes) or path in self.static_files
+
+
+class FastLaneSessionInterface(SessionInterface):
+    """Skips loading the session for fast-lane requests.
+
+    Flask opens the session when the request context is pushed, before any
+    `before_request` hook, so static files and probes get a null session here
+    without touching the store.
+    """
+
+    def __init__(self, inner, fast_lane):
+        self.inner = inner
+        self.fast_lane = fast_lane
+
+    def open_session(self, app, request):
+        if request.path in self.fast_lane:
+            return self.make_null_session(app)
+        return self.inner.open_session(app, request)
+
+    def save_session(self, app, session, response):
+        return self.inner.save_session(app, session, response)
 
 
 def auth_middleware(app):
+    web = app.blueprints.get('web_dynamic')
+    fast_lane = FastLane(web.static_folder if web else None)
+    app.session_interface = FastLaneSessionInterface(app.session_interface, fast_lane)
+
     @app.before_request
     def check_auth():
-        # Paths that don't require authentication
-        open_paths = [
-            # Web routes
-            url_for('web_dynamic.register'),
-            url_for('web_dynamic.login'),
-            url_for('web_dynamic.ttt_ai'),
-            url_for('web_dynamic.tictactoe'),
-            url_for('web_dynamic.home'),
-            url_for('web_dynamic.status'),
-            url_for('web_dynamic.modes'),
-            # API routes
-            url_for('auth.register'),
-            url_for('auth.login'),
-            ]
-
-        # Check if the user is logged in
-        is_logged_in = 'username' in session
-
         # Get the current path
         current_path = request.path
+        if current_path in fast_lane or request.endpoint in OPEN_ENDPOINTS:
+            return
+
+        # Check if the user is logged in
+        if 'username' in session:
+            return
 
         # API routes (excluding /api/auth/register and /api/auth/login)
         if current_path.startswith('/api/'):
-            if current_path not in open_paths and not is_logged_in:
-                return jsonify({"error": "Unauthenticated"}), 401
+            return jsonify({"error": "Unauthenticated"}), 401
 
         # Non-API routes (excluding /register and /login)
-        elif current_path not in open_paths and not is_logged_in and not current_path.startswith('/assets/'):
-            return redirect(url_for('web_dynamic.login', next=request.url))
+        return redirect(url_for('web_dynamic.login', next=request.url))
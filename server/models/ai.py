@@ -0,0 +1,167 @@
+"""Server-side tic-tac-toe AI backed by a fully solved position table."""
+import random
+from .board import FULL_MASK, WINNING
+
+# Bot players use names the username regex rejects, so they can never clash with a user
+BOT_PREFIX = 'bot:'
+
+# Probability that a bot of each difficulty plays an optimal move instead of a random one
+DIFFICULTIES = {'easy': 0.0, 'medium': 0.6, 'hard': 1.0}
+
+# The 8 symmetries of the square as cell permutations: SYMMETRIES[s][cell] is where `cell` goes.
+_ROTATE = (6, 3, 0, 7, 4, 1, 8, 5, 2)
+_MIRROR = (2, 1, 0, 5, 4, 3, 8, 7, 6)
+
+
+def _compose(first, second):
+    return tuple(second[first[cell]] for cell in range(9))
+
+
+def _symmetries():
+    identity = tuple(range(9))
+    rotations = [identity]
+    for _ in range(3):
+        rotations.append(_compose(rotations[-1], _ROTATE))
+    return tuple(rotations + [_compose(rotation, _MIRROR) for rotation in rotations])
+
+
+SYMMETRIES = _symmetries()
+
+EXACT, LOWER, UPPER = 0, 1, 2
+
+
+def is_bot(player_id):
+    return bool(player_id) and player_id.startswith(BOT_PREFIX)
+
+
+def bot_player(difficulty='hard'):
+    """Player id of a bot; raises ValueError for an unknown difficulty."""
+    if difficulty not in DIFFICULTIES:
+        raise ValueError(f"Unknown difficulty: {difficulty}")
+    return BOT_PREFIX + difficulty
+
+
+def bot_difficulty(player_id):
+    return player_id[len(BOT_PREFIX):]
+
+
+def _transform(bits, permutation):
+    result = 0
+    for cell in range(9):
+        if bits & (1 << cell):
+            result |= 1 << permutation[cell]
+    return result
+
+
+def _popcount(bits):
+    return bin(bits).count('1')
+
+
+class AIEngine:
+    """Perfect-play engine with every reachable position solved up front.
+
+    Positions are solved with alpha-beta negamax over a transposition table
+    keyed by the canonical (symmetry-reduced) form of the position, then the
+    best moves of each of the 5,478 legal positions are stored by their exact
+    bitboards, so `best_moves` is a single dict lookup.
+
+    Scores are from the side to move: a win is worth 1 + the empty cells left
+    when it happens, so faster wins and slower losses are preferred.
+    """
+
+    def __init__(self):
+        self._transpositions = {}
+        self.table = {}
+        self._solve_all()
+
+    @staticmethod
+    def to_move(x, o):
+        return 'X' if _popcount(x) == _popcount(o) else 'O'
+
+    @staticmethod
+    def _canonical(x, o):
+        return min((_transform(x, s) << 9) | _transform(o, s) for s in SYMMETRIES)
+
+    def _search(self, mine, theirs, alpha, beta):
+        """Negamax value of a position for the player owning `mine` (to move)."""
+        empties = FULL_MASK & ~(mine | theirs)
+        if WINNING[theirs]:
+            return -(1 + _popcount(empties))
+        if not empties:
+            return 0
+
+        key = self._canonical(mine, theirs)
+        entry = self._transpositions.get(key)
+        original_alpha = alpha
+        if entry:
+            value, flag = entry
+            if flag == EXACT:
+                return value
+            if flag == LOWER:
+                alpha = max(alpha, value)
+            elif flag == UPPER:
+                beta = min(beta, value)
+            if alpha >= beta:
+                return value
+
+        best = -100
+        for cell in range(9):
+            bit = 1 << cell
+            if empties & bit:
+                best = max(best, -self._search(theirs, mine | bit, -beta, -alpha))
+                alpha = max(alpha, best)
+                if alpha >= beta:
+                    break
+
+        flag = UPPER if best <= original_alpha else LOWER if best >= beta else EXACT
+        self._transpositions[key] = (best, flag)
+        return best
+
+    def _solve_all(self):
+        """Store the best moves of every legal non-terminal position."""
+        pending = [(0, 0)]
+        seen = {(0, 0)}
+        while pending:
+            x, o = pending.pop()
+            if WINNING[x] or WINNING[o] or x | o == FULL_MASK:
+                continue
+            x_to_move = self.to_move(x, o) == 'X'
+            mine, theirs = (x, o) if x_to_move else (o, x)
+
+            scores = {}
+            for cell in range(9):
+                bit = 1 << cell
+                if (x | o) & bit:
+                    continue
+                scores[cell] = -self._search(theirs, mine | bit, -100, 100)
+                child = (x | bit, o) if x_to_move else (x, o | bit)
+                if child not in seen:
+                    seen.add(child)
+                    pending.append(child)
+
+            best = max(scores.values())
+            self.table[(x << 9) | o] = (best, tuple(cell for cell, score in scores.items() if score == best), scores)
+        self.positions = len(seen)
+
+    def best_moves(self, board):
+        """All optimal cells for the side to move, or () if the game is over."""
+        entry = self.table.get((board.x << 9) | board.o)
+        return entry[1] if entry else ()
+
+    def evaluate(self, board):
+        """Score of every legal move for the side to move."""
+        entry = self.table.get((board.x << 9) | board.o)
+        return dict(entry[2]) if entry else {}
+
+    def best_move(self, board):
+        moves = self.best_moves(board)
+        return moves[0] if moves else None
+
+    def choose_move(self, board, difficulty='hard', rng=random):
+        """Move for a bot of the given difficulty: optimal or random by chance."""
+        empty = [cell for cell in range(9) if board.is_empty(cell)]
+        if not empty:
+            return None
+        if rng.random() < DIFFICULTIES.get(difficulty, 1.0):
+            return rng.choice(self.best_moves(board))
+        return rng.choice(empty)
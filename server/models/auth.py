@@ -1,16 +1,18 @@
 """Auth here."""
-import bcrypt
 from datetime import datetime
 import regex as re
+from pymongo.errors import DuplicateKeyError
 from .leaderboard import Leaderboard
+from .passwords import PasswordHasher, PasswordHasherBusy
 
 class Auth:
     """Auth class."""
 
-    def __init__(self, db):
+    def __init__(self, db, hasher=None):
         """Iniit."""
         self.db = db
         self.users = self.db['users']
+        self.hasher = hasher or PasswordHasher()
 
         # Precompile regex patterns using the regex library
         self.email_regex = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
@@ -44,7 +46,11 @@ class Auth:
             'created_at': datetime.utcnow(),
             'avatar': ''
         }
-        user = self.users.insert_one(data)
+        try:
+            user = self.users.insert_one(data)
+        except DuplicateKeyError:
+            # Lost a race with a concurrent registration of the same username/email
+            raise ValueError(f"User {username} already exists")
         return user
 
 
@@ -63,13 +69,14 @@ class Auth:
         if not u:
             return (False, 0)
         try:
-            if not bcrypt.checkpw(password.encode('utf-8'), u.get('password').encode('utf-8')):
+            if not self.hasher.check(password, u.get('password')):
                 return (False, 1)
+        except PasswordHasherBusy:
+            raise
         except Exception:
             return (False, 1)
         return (True, 0)
 
-    @staticmethod
-    def hash_password(password: str):
+    def hash_password(self, password: str):
         """Hash given pass."""
-        return bcrypt.hashpw(password.encode(), bcrypt.gensalt()).decode()
+        return self.hasher.hash(password)
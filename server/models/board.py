@@ -0,0 +1,198 @@
+"""Compact tic-tac-toe board stored as two 9-bit integers."""
+
+WIN_MASKS = tuple(
+    sum(1 << cell for cell in line)
+    for line in (
+        (0, 1, 2), (3, 4, 5), (6, 7, 8),  # Rows
+        (0, 3, 6), (1, 4, 7), (2, 5, 8),  # Columns
+        (0, 4, 8), (2, 4, 6)  # Diagonals
+    )
+)
+FULL_MASK = 0b111111111
+
+# WINNING[bits] is truthy when the 9-bit set of cells contains a full line,
+# so a win check is a single table lookup instead of eight mask comparisons.
+WINNING = bytes(
+    any(bits & mask == mask for mask in WIN_MASKS)
+    for bits in range(FULL_MASK + 1)
+)
+
+
+class Bitboard:
+    """A 3x3 board as one bitmask of X cells and one of O cells.
+
+    Cell `i` of the list representation maps to bit `i`. `from_list` and
+    `to_list` round-trip the `''`/`'X'`/`'O'` list used by the API and the
+    `games` collection.
+    """
+
+    __slots__ = ('x', 'o')
+
+    def __init__(self, x=0, o=0):
+        self.x = x
+        self.o = o
+
+    @classmethod
+    def from_list(cls, board):
+        if len(board) != 9:
+            raise ValueError("Board must be a 1x9 array.")
+        x = o = 0
+        for position, cell in enumerate(board):
+            if cell == 'X':
+                x |= 1 << position
+            elif cell == 'O':
+                o |= 1 << position
+        return cls(x, o)
+
+    def to_list(self):
+        return [self[position] for position in range(9)]
+
+    def to_storage(self):
+        return self.to_list()
+
+    def __getitem__(self, position):
+        bit = 1 << position
+        if self.x & bit:
+            return 'X'
+        if self.o & bit:
+            return 'O'
+        return ''
+
+    def __len__(self):
+        return 9
+
+    def __eq__(self, other):
+        return isinstance(other, Bitboard) and self.x == other.x and self.o == other.o
+
+    def copy(self):
+        return Bitboard(self.x, self.o)
+
+    def is_empty(self, position):
+        if not 0 <= position < 9:
+            raise ValueError("Invalid position.")
+        return not (self.x | self.o) & (1 << position)
+
+    def place(self, position, symbol):
+        """Mark a cell for `symbol`; the cell must be empty."""
+        if not self.is_empty(position):
+            raise ValueError("Cell already taken.")
+        if symbol == 'X':
+            self.x |= 1 << position
+        else:
+            self.o |= 1 << position
+
+    def winner(self):
+        """Return `'X'`, `'O'`, `'draw'` or `None` like `Game.check_winner`."""
+        if WINNING[self.x]:
+            return 'X'
+        if WINNING[self.o]:
+            return 'O'
+        if self.x | self.o == FULL_MASK:
+            return 'draw'
+        return None
+
+
+# name -> (board size, marks in a row needed to win)
+VARIANTS = {
+    'classic': (3, 3),
+    'connect4x4': (4, 4),
+    'gomoku': (15, 5),
+}
+
+_SYMBOL_CODES = {'X': 1, 'O': 2}
+_CODE_SYMBOLS = ('', 'X', 'O')
+
+
+class GridBoard:
+    """An N x N board won with K marks in a row, stored as one byte per cell.
+
+    Only the four lines through the last placed mark can have just been
+    completed, so `winner` inspects at most 4 * 2 * (K - 1) cells per move
+    instead of scanning the whole board.
+    """
+
+    __slots__ = ('size', 'win_length', 'cells', 'filled', 'last')
+
+    def __init__(self, size, win_length, cells=None):
+        self.size = size
+        self.win_length = win_length
+        self.cells = bytearray(cells) if cells is not None else bytearray(size * size)
+        self.filled = sum(1 for cell in self.cells if cell)
+        self.last = None
+
+    @classmethod
+    def from_list(cls, board, size, win_length):
+        if len(board) != size * size:
+            raise ValueError(f"Board must be a 1x{size * size} array.")
+        return cls(size, win_length, bytes(_SYMBOL_CODES.get(cell, 0) for cell in board))
+
+    def to_list(self):
+        return [_CODE_SYMBOLS[cell] for cell in self.cells]
+
+    def to_storage(self):
+        return bytes(self.cells)
+
+    def __getitem__(self, position):
+        return _CODE_SYMBOLS[self.cells[position]]
+
+    def __len__(self):
+        return len(self.cells)
+
+    def is_empty(self, position):
+        if not 0 <= position < len(self.cells):
+            raise ValueError("Invalid position.")
+        return not self.cells[position]
+
+    def place(self, position, symbol):
+        """Mark a cell for `symbol`; the cell must be empty."""
+        if not self.is_empty(position):
+            raise ValueError("Cell already taken.")
+        self.cells[position] = _SYMBOL_CODES[symbol]
+        self.filled += 1
+        self.last = position
+
+    def _run(self, row, col, d_row, d_col, code):
+        count = 0
+        row, col = row + d_row, col + d_col
+        while 0 <= row < self.size and 0 <= col < self.size and self.cells[row * self.size + col] == code:
+            count += 1
+            row, col = row + d_row, col + d_col
+        return count
+
+    def winner(self):
+        """Return `'X'`, `'O'`, `'draw'` or `None`, judged from the last move."""
+        if self.last is not None:
+            code = self.cells[self.last]
+            row, col = divmod(self.last, self.size)
+            for d_row, d_col in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                if 1 + self._run(row, col, d_row, d_col, code) + self._run(row, col, -d_row, -d_col, code) >= self.win_length:
+                    return _CODE_SYMBOLS[code]
+        if self.filled == len(self.cells):
+            return 'draw'
+        return None
+
+
+def new_board(variant='classic'):
+    """Empty board for a variant; the classic game uses the bitboard."""
+    if variant == 'classic':
+        return Bitboard()
+    size, win_length = VARIANTS[variant]
+    return GridBoard(size, win_length)
+
+
+def board_from_storage(variant, stored):
+    """Board from a `games` document: a cell list for classic, bytes otherwise."""
+    if variant == 'classic':
+        return Bitboard.from_list(stored)
+    size, win_length = VARIANTS[variant]
+    if isinstance(stored, list):
+        return GridBoard.from_list(stored, size, win_length)
+    return GridBoard(size, win_length, stored)
+
+
+def board_from_moves(variant, moves):
+    """Replay a `games` move log; X plays the even plies and O the odd ones."""
+    board = new_board(variant)
+    for move in moves:
+        board.place(move['c'], 'X' if move['p'] % 2 == 0 else 'O')
+    return board
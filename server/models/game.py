@@ -1,40 +1,118 @@
+from base64 import urlsafe_b64decode, urlsafe_b64encode
 from bson import ObjectId
-from datetime import datetime
+from datetime import datetime, timedelta
+from pymongo import DeleteOne, ReturnDocument, UpdateOne
+from metrics import MOVE_LATENCY
+from .ai import is_bot
+from .board import VARIANTS, Bitboard, board_from_moves, board_from_storage
+from .live_game import LiveGame, LiveGameRegistry, new_move
+
+# Fields left out of game history pages: the board state, and the owning
+# worker, matchmaking score and handoff bookkeeping used only by the server
+HISTORY_PROJECTION = {
+    'board': 0, 'moves': 0, 'current_turn': 0,
+    'worker': 0, 'score': 0, 'handoff_pending': 0, 'handed_off_at': 0,
+}
 
 class Game:
-    def __init__(self, db):
+    def __init__(self, db, flush_interval=0.5, worker_id=None, new_id=ObjectId):
         self.db = db
         self.games = self.db['games']
+        self.worker_id = worker_id
+        # Mints game ids; in multi-worker mode ones that hash to this worker
+        self.new_id = new_id
+        self.live = LiveGameRegistry(self.games, flush_interval)
 
     def search_games_by_status(self, status):
         return self.games.find_one({'status': status}, sort=[('created_at', 1)])
 
-    def create_game(self, player1_id):
+    def create_game(self, player1_id, variant='classic', score=None):
+        if variant not in VARIANTS:
+            raise ValueError("Invalid variant.")
         new_game = {
+            '_id': self.new_id(),
             'players': {'player1': player1_id, 'player2': ''},
             'status': 'waiting',
-            'board': [''] * 9,
+            'variant': variant,
+            'moves': [],
             'created_at': datetime.utcnow(),
             'current_turn': player1_id,
             'winner': '',
             'loser': '',
             'is_draw': False,
         }
+        if self.worker_id:
+            new_game['worker'] = self.worker_id
+        if score is not None:
+            # Lets skill matchmaking on other workers judge the pairing
+            new_game['score'] = score
         result = self.games.insert_one(new_game)
         # print('New game created: ', result.inserted_id)
+        self.live.add(LiveGame(result.inserted_id, player1_id, variant=variant))
+        return result.inserted_id
+
+    def create_bot_game(self, player1_id, bot_id):
+        """Start a game against a server-side bot; the human plays X and moves first."""
+        new_game = {
+            '_id': self.new_id(),
+            'players': {'player1': player1_id, 'player2': bot_id},
+            'status': 'ongoing',
+            'variant': 'classic',
+            'moves': [],
+            'created_at': datetime.utcnow(),
+            'current_turn': player1_id,
+            'winner': '',
+            'loser': '',
+            'is_draw': False,
+        }
+        if self.worker_id:
+            new_game['worker'] = self.worker_id
+        result = self.games.insert_one(new_game)
+        self.live.add(LiveGame(result.inserted_id, player1_id, bot_id, status='ongoing'))
         return result.inserted_id
 
     def join_game(self, game_id, player2_id):
-        self.games.update_one(
-            {'_id': ObjectId(game_id)},
-            {
+        """Atomically claim a waiting game for player2.
+
+        The `status: 'waiting'` filter makes the claim succeed at most once,
+        and the pipeline update copies player1 into `current_turn` server-side.
+        Returns the game as it was before the claim, or None if it is gone or
+        already claimed.
+        """
+        game = self.games.find_one_and_update(
+            {'_id': ObjectId(game_id), 'status': 'waiting', 'players.player1': {'$ne': player2_id}},
+            [{
                 '$set': {
-                    'players.player2': player2_id,
+                    'players.player2': {'$literal': player2_id},
                     'status': 'ongoing',
                     'created_at': datetime.utcnow(),
-                    'current_turn': self.games.find_one({'_id': ObjectId(game_id)})['players']['player1']
+                    'current_turn': '$players.player1'
                 }
-            }
+            }]
+        )
+        if game is None:
+            return None
+        self.apply_join(game_id, player2_id)
+        return game
+
+    def apply_join(self, game_id, player2_id):
+        """Start the live copy of a game player2 just claimed; returns it if held here."""
+        live = self.live.get(game_id)
+        if live:
+            live.player2 = player2_id
+            live.status = 'ongoing'
+            live.current_turn = live.player1
+        return live
+
+    def waiting_games(self, player_id, variant='classic', limit=50):
+        """Oldest waiting games of a variant, for pairing with players on other workers."""
+        return list(
+            self.games.find(
+                {'status': 'waiting', 'variant': variant, 'players.player1': {'$ne': player_id}},
+                {'players': 1, 'created_at': 1, 'score': 1},
+            )
+            .sort('created_at', 1)
+            .limit(limit)
         )
 
     def update_end_at(self, game_id, end_at):
@@ -47,8 +125,8 @@ class Game:
         self.games.update_one({'_id': ObjectId(game_id)}, {'$set': {'current_turn': player_id}})
 
     def update_board(self, game_id, board):
-        if len(board) != 9:
-            raise ValueError("Board must be a 1x9 array.")
+        if len(board) not in {size * size for size, _ in VARIANTS.values()}:
+            raise ValueError("Invalid board size.")
         self.games.update_one({'_id': ObjectId(game_id)}, {'$set': {'board': board}})
 
     def update_status(self, game_id, status):
@@ -68,11 +146,25 @@ class Game:
     def get_game(self, game_id):
         return self.games.find_one({'_id': ObjectId(game_id)})
 
+    def get_live_game(self, game_id):
+        """Return the in-memory state of an active game, if this worker holds it."""
+        return self.live.get(game_id)
+
     def delete_game(self, game_id):
+        self.live.discard(game_id)
         self.games.delete_one({'_id': ObjectId(game_id)})
 
-    def handle_disconnect(self, disconnected_player_id):
-        game = self.search_games_by_player_and_status(disconnected_player_id, ['waiting', 'ongoing'])
+    def handle_disconnect(self, disconnected_player_id, game_id=None):
+        """End the player's waiting or ongoing game.
+
+        When the caller already knows the game and this worker holds it live,
+        no lookup query is needed.
+        """
+        live = self.live.get(game_id) if game_id else None
+        if live:
+            game = {'_id': ObjectId(live.game_id), 'status': live.status, 'players': live.players}
+        else:
+            game = self.search_games_by_player_and_status(disconnected_player_id, ['waiting', 'ongoing'])
         # print('Disconnected player: ', disconnected_player_id, 'game:', game)
         if game:
             if game['status'] == 'waiting':
@@ -80,18 +172,19 @@ class Game:
                 self.delete_game(game['_id'])
             elif game['status'] == 'ongoing':
                 winner = 'player2' if game['players']['player1'] == disconnected_player_id else 'player1'
-                self.games.update_one(
-                    {'_id': game['_id']},
-                    {
-                        '$set': {
-                            'status': 'completed',
-                            'winner': game['players'][winner],
-                            'loser': disconnected_player_id,
-                            'notes': 'Opponent withdrew',
-                            'ended_at': datetime.utcnow()
-                        }
-                    }
-                )
+                update = {
+                    'status': 'completed',
+                    'winner': game['players'][winner],
+                    'loser': disconnected_player_id,
+                    'notes': 'Opponent withdrew',
+                    'ended_at': datetime.utcnow()
+                }
+                live = self.live.discard(game['_id'])
+                if live:
+                    update['moves'] = live.moves
+                    update['board'] = live.board.to_storage()
+                    update['current_turn'] = live.current_turn
+                self.games.update_one({'_id': game['_id']}, {'$set': update})
                 return {'_id': str(game['_id']), 'winner': game['players'][winner]}
                 # print('Game ongoing: ', game)
         return False
@@ -108,48 +201,290 @@ class Game:
         })
         return game
 
-    def delete_ongoing_or_waiting_games(self):
-        result = self.games.delete_many({'status': {'$in': ['waiting', 'ongoing']}})
-        return result.deleted_count
+    def delete_ongoing_or_waiting_games(self, worker_id=None, handoff_ttl=0):
+        """Discard unfinished games, only those of `worker_id` when given.
+
+        Games handed off by a draining worker and not yet claimed by another
+        are kept while a player may still resume them, and discarded once
+        they are older than `handoff_ttl` seconds.
+        """
+        query = {'status': {'$in': ['waiting', 'ongoing']}}
+        if worker_id:
+            query['worker'] = worker_id
+        else:
+            query['handoff_pending.0'] = {'$exists': False}
+        deleted = self.games.delete_many(query).deleted_count
+        expired = {
+            'status': 'ongoing',
+            'handoff_pending.0': {'$exists': True},
+            'handed_off_at': {'$lt': datetime.utcnow() - timedelta(seconds=handoff_ttl)},
+        }
+        if worker_id:
+            # Games another worker already took over are its to clean up
+            expired['worker'] = {'$exists': False}
+        deleted += self.games.delete_many(expired).deleted_count
+        return deleted
+
+    def hand_off(self):
+        """Release every live game before this worker shuts down.
+
+        Waiting games are deleted. Ongoing games get their whole move log
+        written, lose their owner and list their human players as
+        `handoff_pending`, so each can `resume_game` on any worker. Until one does, moves take
+        the document path. Returns `(ongoing, waiting)` lists of `LiveGame`.
+        """
+        ongoing, waiting, requests = [], [], []
+        handed_off_at = datetime.utcnow()
+        for game in self.live.drain():
+            if game.status == 'waiting':
+                waiting.append(game)
+                requests.append(DeleteOne({'_id': ObjectId(game.game_id), 'status': 'waiting'}))
+            elif game.status == 'ongoing':
+                ongoing.append(game)
+                requests.append(UpdateOne(
+                    {'_id': ObjectId(game.game_id), 'status': 'ongoing'},
+                    {
+                        '$set': {
+                            'moves': game.moves,
+                            'current_turn': game.current_turn,
+                            'handoff_pending': [player for player in (game.player1, game.player2) if not is_bot(player)],
+                            'handed_off_at': handed_off_at,
+                        },
+                        '$unset': {'worker': ''},
+                    },
+                ))
+        if requests:
+            self.games.bulk_write(requests, ordered=False)
+        return ongoing, waiting
+
+    def expire_handoffs(self, handoff_ttl):
+        """Settle handed-off games still waiting for a player after `handoff_ttl` seconds.
+
+        A game nobody resumed is deleted. In a game one player resumed, the
+        player who did not forfeits; this is left to the worker that owns it,
+        which holds it live. Every update is conditional on the pending list
+        read here, so a player resuming meanwhile wins. Returns the forfeited
+        games as `{'_id', 'winner', 'loser'}`.
+        """
+        forfeited = []
+        for game in self.games.find({
+            'status': 'ongoing',
+            'handoff_pending.0': {'$exists': True},
+            'handed_off_at': {'$lt': datetime.utcnow() - timedelta(seconds=handoff_ttl)},
+        }):
+            pending = game['handoff_pending']
+            humans = [player for player in game['players'].values() if player and not is_bot(player)]
+            if set(pending) >= set(humans):
+                self.games.delete_one({'_id': game['_id'], 'status': 'ongoing', 'handoff_pending': {'$size': len(pending)}})
+                continue
+            owner = game.get('worker')
+            if owner and owner != self.worker_id:
+                continue
+            loser = pending[0]
+            winner = game['players']['player2'] if game['players']['player1'] == loser else game['players']['player1']
+            update = {
+                'status': 'completed',
+                'winner': winner,
+                'loser': loser,
+                'notes': 'Opponent did not return',
+                'ended_at': datetime.utcnow(),
+            }
+            live = self.live.get(game['_id'])
+            if live:
+                update['moves'] = live.moves
+                update['board'] = live.board.to_storage()
+                update['current_turn'] = live.current_turn
+            ended = self.games.update_one(
+                {'_id': game['_id'], 'status': 'ongoing', 'handoff_pending': loser},
+                {'$set': update, '$unset': {'handoff_pending': ''}},
+            )
+            if ended.modified_count:
+                self.live.discard(game['_id'])
+                forfeited.append({'_id': str(game['_id']), 'winner': winner, 'loser': loser})
+        return forfeited
+
+    def resumable_game(self, player_id):
+        """The player's open game, and whether it is one they may resume."""
+        game = self.search_games_by_player_and_status(player_id, ['waiting', 'ongoing'])
+        return game, bool(game) and player_id in game.get('handoff_pending', ())
+
+    def resume_game(self, game_id, player_id):
+        """Rejoin a handed-off game, taking ownership if no worker has yet.
+
+        Returns `(game, owner)`: the game as a `LiveGame` (held live here when
+        this worker owns it) and the worker that owns it, None when it is this
+        one. Returns `(None, None)` if the player has nothing to resume there.
+        """
+        game = self.games.find_one_and_update(
+            {'_id': ObjectId(game_id), 'status': 'ongoing', 'handoff_pending': player_id},
+            {'$pull': {'handoff_pending': player_id}},
+            return_document=ReturnDocument.AFTER,
+        )
+        if game is None:
+            return None, None
+        if self.worker_id and not game.get('worker'):
+            claimed = self.games.find_one_and_update(
+                {'_id': game['_id'], 'status': 'ongoing', 'worker': {'$exists': False}},
+                {'$set': {'worker': self.worker_id}},
+                return_document=ReturnDocument.AFTER,
+            )
+            if claimed:
+                return self.live.add(LiveGame.from_document(claimed)), None
+            # The other player's worker claimed it in between
+            game = self.get_game(game['_id']) or game
+        owner = game.get('worker')
+        if owner and owner != self.worker_id:
+            return LiveGame.from_document(game), owner
+        return self.live.get(game_id) or self.live.add(LiveGame.from_document(game)), None
 
     def is_player_in_game(self, player_id):
         """Check if the player is already in a waiting or ongoing game."""
         existing_game = self.search_games_by_player_and_status(player_id, ['waiting', 'ongoing'])
         return existing_game is not None
 
+    def make_move(self, game_id, player_id, position):
+        """Validate and apply a move, returning `(game_over, game)`.
+
+        Games held by the live registry are validated and updated in memory;
+        intermediate moves are persisted write-behind and the final state is
+        written synchronously when the game ends. Games this worker does not
+        hold fall back to the atomic `process_move` path.
+        """
+        game = self.live.get(game_id)
+        if game is None:
+            document = self.get_game(game_id)
+            if document is None:
+                raise ValueError("Game not found.")
+            with MOVE_LATENCY.time('persist'):
+                game_over = self.process_move(document, game_id, player_id, position)
+            game = LiveGame.from_document(document)
+            game.play(position, game.symbol_for(player_id))
+            game.current_turn = game.opponent_of(player_id)
+            return game_over, game
+
+        with MOVE_LATENCY.time('validate'), self.live.lock():
+            if game.status != 'ongoing' or game.current_turn != player_id:
+                raise ValueError("Move rejected: not your turn.")
+            if not game.board.is_empty(position):
+                raise ValueError("Move rejected: cell already taken.")
+
+            symbol = game.symbol_for(player_id)
+            game.play(position, symbol)
+            game.current_turn = game.opponent_of(player_id)
+
+            winner = game.board.winner()
+            if not winner:
+                self.live.mark_dirty(game.game_id)
+                return False, game
+            game.status = 'completed'
+
+        self.live.discard(game.game_id)
+        fields, game_over = self.game_over_update(winner, symbol, game.players)
+        # The whole log is rewritten once so a concurrent flush cannot leave it short;
+        # the final board is cached next to it for readers that skip the replay.
+        fields.update({'moves': game.moves, 'board': game.board.to_storage(), 'current_turn': game.current_turn})
+        with MOVE_LATENCY.time('persist'):
+            self.games.update_one({'_id': ObjectId(game_id), 'status': 'ongoing'}, {'$set': fields})
+        return game_over, game
+
     def process_move(self, game, game_id, player_id, position):
-        """Process a player's move."""
+        """Process a player's move.
+
+        The move is appended to the move log with a single conditional
+        findAndModify: the filter re-checks that the game is ongoing, that it
+        is the player's turn and that the log has not grown since it was
+        read, so two racing moves can never both land. Turn and (when the
+        move ends the game) status, winner/loser and ended_at are applied in
+        the same round-trip.
+        """
+        moves = game.get('moves', [])
         symbol = 'X' if player_id == game['players']['player1'] else 'O'
-        new_board = game['board']
-        new_board[position] = symbol
+        board = self.board_of(game)
+        board.place(position, symbol)
 
         next_turn = game['players']['player2'] if player_id == game['players']['player1'] else game['players']['player1']
 
-        self.update_board(game_id, new_board)
-        self.update_current_turn(game_id, next_turn)
+        update = {'$push': {'moves': new_move(position, len(moves))}, '$set': {'current_turn': next_turn}}
 
-        winner = self.check_winner(new_board)
+        game_over = False
+        winner = board.winner()
         if winner:
-            return self.handle_game_over(game_id, winner, symbol, game)
+            game_over_fields, game_over = self.game_over_update(winner, symbol, game['players'])
+            update['$set'].update(game_over_fields)
+            update['$set']['board'] = board.to_storage()
 
-        return False
+        committed = self.games.find_one_and_update(
+            {
+                '_id': ObjectId(game_id),
+                'status': 'ongoing',
+                'current_turn': player_id,
+                'moves': {'$size': len(moves)},
+            },
+            update,
+            projection={'_id': 1},
+        )
+        if committed is None:
+            raise ValueError("Move rejected: not your turn or cell already taken.")
 
-    def handle_game_over(self, game_id, winner, symbol, game):
-        """Handle the end of the game."""
-        if winner == 'draw':
-            self.update_status(game_id, 'completed')
-            self.update_is_draw(game_id, True)
-            self.update_end_at(game_id, datetime.now())
+        return game_over
 
-            return  {'result': 'draw'}
-        else:
-            winner_id = game['players']['player1'] if symbol == 'X' else game['players']['player2']
-            loser_id = game['players']['player2'] if symbol == 'X' else game['players']['player1']
-            self.update_status(game_id, 'completed')
-            self.update_winner_loser(game_id, winner_id, loser_id)
-            self.update_end_at(game_id, datetime.now())
+    @staticmethod
+    def board_of(game):
+        """Board of a `games` document, replayed from its move log."""
+        variant = game.get('variant', 'classic')
+        if 'moves' in game:
+            return board_from_moves(variant, game['moves'])
+        return board_from_storage(variant, game['board'])
+
+    def get_replay(self, game_id):
+        """Move-by-move record of a game, or None if it does not exist."""
+        game = self.games.find_one({'_id': ObjectId(game_id)})
+        if game is None:
+            return None
+        variant = game.get('variant', 'classic')
+        size, win_length = VARIANTS[variant]
+        return {
+            'game_id': str(game['_id']),
+            'players': game['players'],
+            'variant': variant,
+            'size': size,
+            'win_length': win_length,
+            'status': game['status'],
+            'winner': game.get('winner', ''),
+            'is_draw': game.get('is_draw', False),
+            'created_at': game['created_at'],
+            'ended_at': game.get('ended_at'),
+            'moves': [
+                {
+                    'ply': move['p'],
+                    'position': move['c'],
+                    'symbol': 'X' if move['p'] % 2 == 0 else 'O',
+                    'played_at': move['t'],
+                }
+                for move in game.get('moves', [])
+            ],
+        }
 
-            return {'result': 'win', 'winner': winner_id}
+    @staticmethod
+    def game_over_update(winner, symbol, players):
+        """Build the end-of-game fields and the result sent to the players."""
+        if winner == 'draw':
+            fields = {
+                'status': 'completed',
+                'is_draw': True,
+                'ended_at': datetime.now(),
+            }
+            return fields, {'result': 'draw'}
+
+        winner_id = players['player1'] if symbol == 'X' else players['player2']
+        loser_id = players['player2'] if symbol == 'X' else players['player1']
+        fields = {
+            'status': 'completed',
+            'winner': winner_id,
+            'loser': loser_id,
+            'ended_at': datetime.now(),
+        }
+        return fields, {'result': 'win', 'winner': winner_id}
 
     # def delete_all_games(self):
     #     return self.games.delete_many({})
@@ -178,23 +513,64 @@ class Game:
                 ]
 
             total = self.games.count_documents(query)
-            games_cursor = self.games.find(query, {'board': 0, 'current_turn': 0, '_id': 0}).skip((page - 1) * per_page).limit(per_page)
+            games_cursor = self.games.find(query, dict(HISTORY_PROJECTION, _id=0)).skip((page - 1) * per_page).limit(per_page)
             games = list(games_cursor)
             return games, total
 
-    @staticmethod
-    def check_winner(board):
-        winning_combinations = [
-            [0, 1, 2], [3, 4, 5], [6, 7, 8],  # Rows
-            [0, 3, 6], [1, 4, 7], [2, 5, 8],  # Columns
-            [0, 4, 8], [2, 4, 6]  # Diagonals
-        ]
+    def get_games_after(self, username, per_page, cursor=None, include_total=False):
+        """Keyset-paginated game history, newest first.
+
+        Pages are keyed on `(created_at, _id)`, so every page costs the same
+        index range scan no matter how deep it is. Returns the games, the
+        opaque cursor for the next page (None on the last page) and the total,
+        which is only counted when asked for.
+        """
+        if per_page < 1:
+            raise ValueError("per_page must be at least 1.")
+        players = {'$or': [
+            {'players.player1': username},
+            {'players.player2': username}
+        ]}
+        query = players
+        if cursor:
+            created_at, game_id = self.decode_cursor(cursor)
+            query = {'$and': [players, {'$or': [
+                {'created_at': {'$lt': created_at}},
+                {'created_at': created_at, '_id': {'$lt': game_id}}
+            ]}]}
+
+        games = list(
+            self.games.find(query, HISTORY_PROJECTION)
+            .sort([('created_at', -1), ('_id', -1)])
+            .limit(per_page + 1)
+        )
+        next_cursor = None
+        if len(games) > per_page:
+            games = games[:per_page]
+            next_cursor = self.encode_cursor(games[-1]['created_at'], games[-1]['_id'])
+        for game in games:
+            del game['_id']
+
+        total = self.games.count_documents(players) if include_total else None
+        return games, next_cursor, total
 
-        for combo in winning_combinations:
-            if board[combo[0]] == board[combo[1]] == board[combo[2]] != '':
-                return board[combo[0]]
+    @staticmethod
+    def encode_cursor(created_at, game_id):
+        token = f"{created_at.isoformat()}|{game_id}"
+        return urlsafe_b64encode(token.encode()).decode().rstrip('=')
 
-        if '' not in board:
-            return 'draw'
+    @staticmethod
+    def decode_cursor(cursor):
+        try:
+            token = urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)).decode()
+            created_at, game_id = token.split('|')
+            return datetime.fromisoformat(created_at), ObjectId(game_id)
+        except Exception:
+            raise ValueError("Invalid cursor.")
 
-        return None
+    @staticmethod
+    def check_winner(board):
+        """Return 'X', 'O', 'draw' or None for a board list or `Bitboard`."""
+        if not isinstance(board, Bitboard):
+            board = Bitboard.from_list(board)
+        return board.winner()
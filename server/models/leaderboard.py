@@ -1,9 +1,19 @@
 from bson import ObjectId
+from pymongo import ReturnDocument
+from .ranking import ScoreRanking
+from .user import WIN_POINTS, DRAW_POINTS, incremented, clamped_score
 
 class Leaderboard:
-    def __init__(self, db):
+    def __init__(self, db, sync=None):
         self.db = db
         self.leaderboard = self.db['leaderboard']
+        self.ranking = ScoreRanking(top_size=100)
+        # Multi-worker mode: a `RankingSync` that mirrors changes to the other workers
+        self.sync = sync
+
+    def load_ranking(self):
+        """Build the in-memory ranking from the leaderboard collection."""
+        self.ranking.load(self.leaderboard.find({}, {'_id': 0}))
 
     def add_user(self, username):
         """Add a new user to the leaderboard."""
@@ -14,32 +24,79 @@ class Leaderboard:
             'score': 0
         }
         self.leaderboard.insert_one(new_entry)
+        self._store(new_entry)
 
     def update_wins(self, username):
         """Update the number of wins for a user."""
-        self.leaderboard.update_one({'username': username}, {'$inc': {'wins': 1, 'score': 3}})
+        self._increment(username, wins=1, score=WIN_POINTS)
 
     def update_draws(self, username):
         """Update the number of draws for a user."""
-        self.leaderboard.update_one({'username': username}, {'$inc': {'draws': 1, 'score': 1}})
+        self._increment(username, draws=1, score=DRAW_POINTS)
+
+    @staticmethod
+    def stats_pipeline(wins=0, draws=0, score=0):
+        """Update pipeline adding results, with the score clamped at zero."""
+        return [{'$set': {
+            'wins': incremented('wins', wins),
+            'draws': incremented('draws', draws),
+            'score': clamped_score(score),
+        }}]
+
+    def _increment(self, username, wins=0, draws=0, score=0):
+        """Apply an increment and sync the ranking with the resulting document."""
+        entry = self.leaderboard.find_one_and_update(
+            {'username': username},
+            self.stats_pipeline(wins, draws, score),
+            projection={'_id': 0},
+            return_document=ReturnDocument.AFTER,
+        )
+        if entry:
+            self._store(entry)
+
+    def _store(self, entry):
+        """Put a stored leaderboard document into the ranking, on every worker."""
+        self.ranking.set(entry)
+        if self.sync:
+            self.sync.publish_set(entry)
+
+    def refresh(self, usernames):
+        """Reload players from their stored documents after bulk writes."""
+        for entry in self.leaderboard.find({'username': {'$in': list(usernames)}}, {'_id': 0}):
+            self._store(entry)
 
     def get_leaderboard(self, limit=10):
         """Retrieve the leaderboard, sorted by score."""
-        return list(self.leaderboard.find().sort('score', -1).limit(limit))
+        return self.ranking.top(limit)
+
+    def get_top_payload(self):
+        """Serialized top-100 leaderboard, cached until the top-100 changes."""
+        return self.ranking.top_payload()
 
     def get_user_stats(self, username):
         """Retrieve the stats for a specific user."""
-        return self.leaderboard.find_one({'username': username}, {'_id': 0})
+        stats = self.ranking.get(username)
+        if stats is None:
+            stats = self.leaderboard.find_one({'username': username}, {'_id': 0})
+        return stats
 
     def get_user_rank(self, username):
-        """Retrieve the rank of a specific user."""
-        user = self.leaderboard.find_one({'username': username}, {'score': 1})
-        if not user:
-            return None
-        user_score = user['score']
-        rank = self.leaderboard.count_documents({'score': {'$gt': user_score}}) + 1
+        """Retrieve the rank of a specific user.
+
+        A player missing from this worker's ranking (e.g. registered on
+        another worker before a sync arrived) is loaded from the collection.
+        """
+        rank = self.ranking.rank(username)
+        if rank is None:
+            entry = self.leaderboard.find_one({'username': username}, {'_id': 0})
+            if entry:
+                self.ranking.set(entry)
+                rank = self.ranking.rank(username)
         return rank
 
     def delete_user(self, username):
         """Delete a user from the leaderboard."""
         self.leaderboard.delete_one({'username': username})
+        self.ranking.remove(username)
+        if self.sync:
+            self.sync.publish_remove(username)
@@ -0,0 +1,173 @@
+"""In-memory registry of the games currently being played on this worker."""
+import threading
+import time
+from datetime import datetime
+from bson import ObjectId
+from logs import get_logger
+from metrics import MOVE_LATENCY
+from pymongo import UpdateOne
+from .board import board_from_moves, board_from_storage, new_board
+
+LOG = get_logger('live_game')
+
+
+def new_move(cell, ply):
+    """Move log entry: cell index, ply number (0 for X's first move) and time."""
+    return {'c': cell, 'p': ply, 't': datetime.utcnow()}
+
+
+class LiveGame:
+    """Compact in-memory state of a waiting or ongoing game."""
+
+    __slots__ = ('game_id', 'player1', 'player2', 'board', 'current_turn', 'status', 'variant', 'moves', 'flushed')
+
+    def __init__(self, game_id, player1, player2='', board=None, current_turn=None, status='waiting', variant='classic', moves=None):
+        self.game_id = str(game_id)
+        self.player1 = player1
+        self.player2 = player2
+        self.board = board if board is not None else new_board(variant)
+        self.current_turn = current_turn if current_turn is not None else player1
+        self.status = status
+        self.variant = variant
+        self.moves = moves if moves is not None else []
+        # Number of `moves` already appended to the stored move log
+        self.flushed = len(self.moves)
+
+    @classmethod
+    def from_document(cls, game):
+        """Build a live game from a `games` collection document."""
+        variant = game.get('variant', 'classic')
+        moves = game.get('moves')
+        board = board_from_moves(variant, moves) if moves is not None else board_from_storage(variant, game['board'])
+        return cls(
+            game['_id'],
+            game['players']['player1'],
+            game['players']['player2'],
+            board,
+            game['current_turn'],
+            game['status'],
+            variant,
+            list(moves or ()),
+        )
+
+    def play(self, position, symbol):
+        """Place a mark and append it to the move log."""
+        self.board.place(position, symbol)
+        self.moves.append(new_move(position, len(self.moves)))
+
+    @property
+    def players(self):
+        return {'player1': self.player1, 'player2': self.player2}
+
+    def symbol_for(self, player_id):
+        return 'X' if player_id == self.player1 else 'O'
+
+    def opponent_of(self, player_id):
+        return self.player2 if player_id == self.player1 else self.player1
+
+
+class LiveGameRegistry:
+    """Authoritative store for active games with write-behind persistence.
+
+    Moves are validated and applied against the in-memory `LiveGame`, the game
+    is marked dirty and a background flusher appends the new moves and turn of
+    every dirty game in one `bulk_write` per interval. Status transitions (join, end
+    of game, disconnect) are always written synchronously by the `Game` model,
+    so the write-behind buffer only ever holds intermediate moves.
+
+    Crash recovery: the only state that can be lost is the unflushed moves of
+    games still in progress, and `Game.delete_ongoing_or_waiting_games` discards
+    exactly those games when the server starts, so nothing half-written is
+    ever served after a restart.
+    """
+
+    def __init__(self, collection, flush_interval=0.5):
+        self.collection = collection
+        self.flush_interval = flush_interval
+        self._games = {}
+        self._dirty = set()
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def __len__(self):
+        return len(self._games)
+
+    def get(self, game_id):
+        return self._games.get(str(game_id))
+
+    def add(self, live_game):
+        with self._lock:
+            self._games[live_game.game_id] = live_game
+        return live_game
+
+    def discard(self, game_id):
+        """Forget a game, dropping any pending write for it."""
+        game_id = str(game_id)
+        with self._lock:
+            self._dirty.discard(game_id)
+            return self._games.pop(game_id, None)
+
+    def drain(self):
+        """Forget every game and return them, for handing them to other workers."""
+        with self._lock:
+            games, self._games = list(self._games.values()), {}
+            self._dirty = set()
+        return games
+
+    def lock(self):
+        """Lock guarding validate-then-apply of a move."""
+        return self._lock
+
+    def mark_dirty(self, game_id):
+        """Schedule a write-behind flush of a game (call with `lock()` held)."""
+        self._dirty.add(str(game_id))
+        if self._flusher is None:
+            self._start_flusher()
+
+    def flush(self):
+        """Append the unflushed moves of every dirty game in a single batch.
+
+        Each append is conditional on the stored log still having `flushed`
+        entries, so retrying a batch that partly landed never duplicates moves.
+        """
+        with self._lock:
+            dirty, self._dirty = self._dirty, set()
+            pending = [
+                (game, len(game.moves))
+                for game in (self._games.get(game_id) for game_id in dirty)
+                if game is not None and game.flushed < len(game.moves)
+            ]
+            requests = [
+                UpdateOne(
+                    {'_id': ObjectId(game.game_id), 'status': 'ongoing', 'moves': {'$size': game.flushed}},
+                    {
+                        '$push': {'moves': {'$each': game.moves[game.flushed:count]}},
+                        '$set': {'current_turn': game.current_turn},
+                    },
+                )
+                for game, count in pending
+            ]
+        if requests:
+            try:
+                with MOVE_LATENCY.time('flush'):
+                    self.collection.bulk_write(requests, ordered=False)
+            except Exception:
+                with self._lock:
+                    self._dirty.update(game.game_id for game, _ in pending if game.game_id in self._games)
+                raise
+            with self._lock:
+                for game, count in pending:
+                    game.flushed = max(game.flushed, count)
+        return len(requests)
+
+    def _start_flusher(self):
+        self._flusher = threading.Thread(target=self._flush_loop, name='live-game-flusher', daemon=True)
+        self._flusher.start()
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            try:
+                self.flush()
+            except Exception:
+                LOG.exception('live_game_flush_failed')
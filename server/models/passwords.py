@@ -0,0 +1,98 @@
+"""Password hashing off the event loop, with backpressure and a login cache."""
+import hashlib
+import hmac
+import secrets
+import threading
+import time
+from collections import OrderedDict
+import bcrypt
+from metrics import PASSWORD_HASH_LATENCY
+
+try:
+    from eventlet import tpool
+except ImportError:  # Scripts and tools that run without eventlet
+    tpool = None
+
+
+class PasswordHasherBusy(Exception):
+    """Too many password operations are queued; the caller should retry later."""
+
+
+class PasswordHasher:
+    """Runs bcrypt in a bounded pool of OS threads.
+
+    bcrypt releases the GIL while it works, so running it through eventlet's
+    `tpool` keeps the hub free for sockets while up to `max_workers` hashes
+    run in parallel on real threads. Once `max_pending` calls are in flight
+    or waiting for a worker, new ones fail fast with `PasswordHasherBusy`
+    instead of queueing without bound.
+
+    A successful `check` is remembered for `cache_ttl` seconds, so repeated
+    logins with the same credentials skip bcrypt. The cache key is a keyed
+    digest of the stored hash and the password, under a per-process random
+    key, so changing the password invalidates it and nothing reversible is
+    kept in memory.
+    """
+
+    def __init__(self, rounds=12, max_workers=4, max_pending=64, cache_ttl=60, cache_size=10000):
+        self.rounds = rounds
+        self.max_pending = max_pending
+        self.cache_ttl = cache_ttl
+        self.cache_size = cache_size
+        self._workers = threading.BoundedSemaphore(max_workers)
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._cache = OrderedDict()
+        self._cache_key = secrets.token_bytes(32)
+        self.cache_hits = 0
+        self.rejected = 0
+
+    def _run(self, function, *args):
+        with self._pending_lock:
+            if self._pending >= self.max_pending:
+                self.rejected += 1
+                raise PasswordHasherBusy("Too many password operations in progress, try again.")
+            self._pending += 1
+        try:
+            with self._workers, PASSWORD_HASH_LATENCY.time(function.__name__):
+                if tpool is None:
+                    return function(*args)
+                return tpool.execute(function, *args)
+        finally:
+            with self._pending_lock:
+                self._pending -= 1
+
+    def hash(self, password):
+        """bcrypt hash of `password` at the configured cost factor."""
+        salt = bcrypt.gensalt(self.rounds)
+        return self._run(bcrypt.hashpw, password.encode(), salt).decode()
+
+    def _digest(self, password, hashed):
+        return hmac.new(self._cache_key, hashed.encode() + b'\0' + password.encode(), hashlib.sha256).digest()
+
+    def check(self, password, hashed):
+        """Whether `password` matches the stored bcrypt `hashed`."""
+        digest = self._digest(password, hashed)
+        now = time.monotonic()
+        expires_at = self._cache.get(digest)
+        if expires_at is not None:
+            if expires_at > now:
+                self.cache_hits += 1
+                return True
+            self._cache.pop(digest, None)
+
+        if not self._run(bcrypt.checkpw, password.encode(), hashed.encode()):
+            return False
+        if self.cache_ttl > 0:
+            self._cache[digest] = now + self.cache_ttl
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+        return True
+
+    def stats(self):
+        return {
+            'pending': self._pending,
+            'cache_size': len(self._cache),
+            'cache_hits': self.cache_hits,
+            'rejected': self.rejected,
+        }
@@ -0,0 +1,182 @@
+"""In-memory leaderboard ranking kept in sync with the `leaderboard` collection."""
+import bisect
+import json
+import threading
+
+
+class _Fenwick:
+    """Binary indexed tree counting players per score value."""
+
+    def __init__(self, size):
+        self.size = size
+        self.tree = [0] * (size + 1)
+
+    def add(self, score, delta):
+        i = score + 1
+        while i <= self.size:
+            self.tree[i] += delta
+            i += i & -i
+
+    def count_at_most(self, score):
+        i = min(score + 1, self.size)
+        total = 0
+        while i > 0:
+            total += self.tree[i]
+            i -= i & -i
+        return total
+
+
+class ScoreRanking:
+    """Order-statistics view of the leaderboard.
+
+    A Fenwick tree over score values answers "how many players score more
+    than s" in O(log S), so any user's rank is O(log S). Distinct scores are
+    kept sorted with the usernames holding each one, which makes top-N a
+    walk from the highest score down. The serialized top-N payload is cached
+    and only dropped when a change can actually alter it.
+    """
+
+    def __init__(self, top_size=100):
+        self.top_size = top_size
+        self._entries = {}
+        self._by_score = {}
+        self._scores = []
+        self._counts = _Fenwick(64)
+        self._top = None
+        self._top_payload = None
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def load(self, entries):
+        """Replace the ranking with `leaderboard` documents."""
+        with self._lock:
+            self._entries = {}
+            self._by_score = {}
+            self._scores = []
+            self._counts = _Fenwick(64)
+            self._invalidate()
+            for entry in entries:
+                self._insert(self._clean(entry))
+
+    def set(self, entry):
+        """Insert or update a player from their latest `leaderboard` document."""
+        entry = self._clean(entry)
+        with self._lock:
+            old = self._entries.get(entry['username'])
+            if old is not None:
+                self._remove(old)
+            self._insert(entry)
+            if self._affects_top(old, entry):
+                self._invalidate()
+
+    def increment(self, username, wins=0, draws=0, score=0):
+        """Apply counter increments to a known player."""
+        entry = self.get(username)
+        if entry is None:
+            return
+        entry['wins'] += wins
+        entry['draws'] += draws
+        entry['score'] += score
+        self.set(entry)
+
+    def remove(self, username):
+        with self._lock:
+            old = self._entries.get(username)
+            if old is None:
+                return
+            self._remove(old)
+            if self._affects_top(old, None):
+                self._invalidate()
+
+    def get(self, username):
+        entry = self._entries.get(username)
+        return dict(entry) if entry else None
+
+    def rank(self, username):
+        """1 + the number of players with a strictly higher score."""
+        entry = self._entries.get(username)
+        if entry is None:
+            return None
+        with self._lock:
+            return len(self._entries) - self._counts.count_at_most(entry['score']) + 1
+
+    def top(self, limit):
+        if limit <= self.top_size:
+            with self._lock:
+                return [dict(self._entries[username]) for username in self._cached_top()[:limit]]
+        with self._lock:
+            return [dict(self._entries[username]) for username in self._walk(limit)]
+
+    def top_payload(self):
+        """JSON array of the top `top_size` players, rebuilt only when stale."""
+        with self._lock:
+            if self._top_payload is None:
+                self._top_payload = json.dumps([self._entries[username] for username in self._cached_top()])
+            return self._top_payload
+
+    @staticmethod
+    def _clean(entry):
+        return {
+            'username': entry['username'],
+            'wins': entry.get('wins', 0),
+            'draws': entry.get('draws', 0),
+            'score': max(0, int(entry.get('score', 0))),
+        }
+
+    def _insert(self, entry):
+        score = entry['score']
+        if score >= self._counts.size:
+            self._grow(score)
+        self._entries[entry['username']] = entry
+        players = self._by_score.get(score)
+        if players is None:
+            players = self._by_score[score] = set()
+            bisect.insort(self._scores, score)
+        players.add(entry['username'])
+        self._counts.add(score, 1)
+
+    def _remove(self, entry):
+        score = entry['score']
+        del self._entries[entry['username']]
+        players = self._by_score[score]
+        players.discard(entry['username'])
+        if not players:
+            del self._by_score[score]
+            del self._scores[bisect.bisect_left(self._scores, score)]
+        self._counts.add(score, -1)
+
+    def _grow(self, score):
+        size = self._counts.size
+        while size <= score:
+            size *= 2
+        self._counts = _Fenwick(size)
+        for value, players in self._by_score.items():
+            self._counts.add(value, len(players))
+
+    def _walk(self, limit):
+        usernames = []
+        for score in reversed(self._scores):
+            usernames.extend(sorted(self._by_score[score]))
+            if len(usernames) >= limit:
+                break
+        return usernames[:limit]
+
+    def _cached_top(self):
+        if self._top is None:
+            self._top = self._walk(self.top_size)
+        return self._top
+
+    def _affects_top(self, old, new):
+        """Whether moving a player from `old` to `new` can change the top list."""
+        top = self._top
+        if top is None:
+            return False
+        if len(top) < self.top_size or (old is not None and old['username'] in top):
+            return True
+        return new is not None and new['score'] >= self._entries[top[-1]]['score']
+
+    def _invalidate(self):
+        self._top = None
+        self._top_payload = None
@@ -0,0 +1,104 @@
+"""Applies finished game results to the users and leaderboard collections."""
+import threading
+import time
+from logs import get_logger
+from pymongo import UpdateOne
+from .user import User, WIN_POINTS, DRAW_POINTS, LOSS_POINTS
+
+LOG = get_logger('settlement')
+
+
+class Settlement:
+    """Settles game results with one `bulk_write` per collection.
+
+    With `batch_interval` set, results are queued and a background flusher
+    coalesces everything that finished within the same interval into a single
+    pair of bulk writes; otherwise each game is settled as it ends. User scores
+    are clamped at zero server-side by the `stats_pipeline` updates, so no
+    document is read before it is written.
+    """
+
+    def __init__(self, db, leaderboard, batch_interval=0):
+        self.users = db['users']
+        self.leaderboard = leaderboard
+        self.batch_interval = batch_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._flusher = None
+
+    def settle_win(self, winner, loser):
+        self._submit([(winner, 'win'), (loser, 'loss')])
+
+    def settle_draw(self, player1, player2):
+        self._submit([(player1, 'draw'), (player2, 'draw')])
+
+    def _submit(self, outcomes):
+        if not self.batch_interval:
+            self.apply(outcomes)
+            return
+        with self._lock:
+            self._pending.extend(outcomes)
+            if self._flusher is None:
+                self._flusher = threading.Thread(target=self._flush_loop, name='settlement-flusher', daemon=True)
+                self._flusher.start()
+
+    def flush(self):
+        """Settle every queued result now."""
+        with self._lock:
+            outcomes, self._pending = self._pending, []
+        if outcomes:
+            self.apply(outcomes)
+
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.batch_interval)
+            try:
+                self.flush()
+            except Exception:
+                LOG.exception('settlement_flush_failed')
+
+    def apply(self, outcomes):
+        """Write `(username, 'win' | 'loss' | 'draw')` outcomes, in order."""
+        totals = {}
+        for username, outcome in outcomes:
+            user = totals.setdefault(username, {'win': 0, 'loss': 0, 'draw': 0, 'score_deltas': []})
+            user[outcome] += 1
+            delta = {'win': WIN_POINTS, 'loss': LOSS_POINTS, 'draw': DRAW_POINTS}[outcome]
+            deltas = user['score_deltas']
+            # Clamping is only order-sensitive when the sign changes, so
+            # consecutive deltas of the same sign share one pipeline stage.
+            if deltas and (delta > 0) == (deltas[-1] > 0):
+                deltas[-1] += delta
+            else:
+                deltas.append(delta)
+
+        user_requests = []
+        leaderboard_requests = []
+        for username, user in totals.items():
+            user_requests.append(UpdateOne(
+                {'username': username},
+                User.stats_pipeline(user['win'], user['loss'], user['draw'], user['score_deltas']),
+            ))
+            # Losses do not touch the leaderboard.
+            points = user['win'] * WIN_POINTS + user['draw'] * DRAW_POINTS
+            if points:
+                leaderboard_requests.append(UpdateOne(
+                    {'username': username},
+                    self.leaderboard.stats_pipeline(user['win'], user['draw'], points),
+                ))
+
+        if user_requests:
+            self.users.bulk_write(user_requests, ordered=False)
+        if leaderboard_requests:
+            self.leaderboard.leaderboard.bulk_write(leaderboard_requests, ordered=False)
+            if self.leaderboard.sync:
+                # Other workers write these documents too, so the stored ones are authoritative
+                self.leaderboard.refresh(username for username, user in totals.items() if user['win'] or user['draw'])
+                return
+            for username, user in totals.items():
+                self.leaderboard.ranking.increment(
+                    username,
+                    wins=user['win'],
+                    draws=user['draw'],
+                    score=user['win'] * WIN_POINTS + user['draw'] * DRAW_POINTS,
+                )
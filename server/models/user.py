@@ -1,40 +1,63 @@
 import regex as re
-import bcrypt
-from models.auth import Auth
+from models.passwords import PasswordHasher
+
+WIN_POINTS = 3
+DRAW_POINTS = 1
+LOSS_POINTS = -3
+
+
+def incremented(field, amount):
+    '''Aggregation expression adding `amount` to a possibly missing counter.'''
+    return {'$add': [{'$ifNull': [f'${field}', 0]}, amount]}
+
+
+def clamped_score(delta):
+    '''Aggregation expression for `max(0, score + delta)`.'''
+    return {'$max': [0, incremented('score', delta)]}
+
 
 class User:
-    def __init__(self, db):
+    def __init__(self, db, hasher=None):
         '''Initialize a User instance'''
         self.db = db
         self.users = self.db['users']
+        self.hasher = hasher or PasswordHasher()
 
         # Precompile regex patterns using the regex library
         self.email_regex = re.compile(r"^[a-zA-Z0-9._%+-]+@[a-zA-Z0-9.-]+\.[a-zA-Z]{2,}$")
         self.username_regex = re.compile(r"^[a-zA-Z0-9_-]{3,20}$")
 
 
-    def _update_score(self, username, score):
-        '''Updates the score of the given user.'''
-        self.users.update_one({'username': username}, {'$inc': {'score': score}})
+    @staticmethod
+    def stats_pipeline(wins=0, losses=0, draws=0, score_deltas=()):
+        '''Builds an update pipeline applying result counters and score changes.
+
+        Each score delta is its own stage, clamped at zero server-side, so a
+        sequence of results is applied atomically and in order without reading
+        the document first.
+        '''
+        games = wins + losses + draws
+        pipeline = [{'$set': {
+            'wins': incremented('wins', wins),
+            'losses': incremented('losses', losses),
+            'draws': incremented('draws', draws),
+            'game_played': incremented('game_played', games),
+        }}]
+        for delta in score_deltas:
+            pipeline.append({'$set': {'score': clamped_score(delta)}})
+        return pipeline
 
     def increment_wins(self, username):
         '''Increments the wins of the given username by one.'''
-        self.users.update_one({'username': username}, {'$inc': {'wins': 1, 'game_played': 1}})
-        self._update_score(username, 3)
+        self.users.update_one({'username': username}, self.stats_pipeline(wins=1, score_deltas=[WIN_POINTS]))
 
     def increment_losses(self, username):
         '''Increments the loses of the given username by one.'''
-        user = self.users.find_one({'username': username})
-        if user['score'] >= 3:
-            self._update_score(username, -3)
-        else:
-            self._update_score(username, -user['score'])
-        self.users.update_one({'username': username}, {'$inc': {'losses': 1, 'game_played': 1}})
+        self.users.update_one({'username': username}, self.stats_pipeline(losses=1, score_deltas=[LOSS_POINTS]))
 
     def increment_draws(self, username):
         '''Increments the draws of the given username by one.'''
-        self.users.update_one({'username': username}, {'$inc': {'draws': 1, 'game_played': 1}})
-        self._update_score(username, 1)
+        self.users.update_one({'username': username}, self.stats_pipeline(draws=1, score_deltas=[DRAW_POINTS]))
 
     def update_username(self, username, new_username):
         '''Updates username to new_username.'''
@@ -83,8 +106,8 @@ class User:
 
     def update_password(self, username, old_password, new_password):
         user = self.users.find_one({'username': username})
-        if bcrypt.checkpw(old_password.encode(), user['password'].encode()):
-            self.users.update_one({'username': username}, {'$set': {'password': Auth.hash_password(new_password)}})
+        if self.hasher.check(old_password, user['password']):
+            self.users.update_one({'username': username}, {'$set': {'password': self.hasher.hash(new_password)}})
             return True
         else:
             raise ValueError("Old password does not match the current password")
@@ -0,0 +1,126 @@
+"""Per-socket identity and room bookkeeping for this worker."""
+import threading
+
+
+class Connection:
+    """Who is behind a socket and which game they are playing."""
+
+    __slots__ = ('sid', 'player_id', 'game_id', 'symbol', 'variant', 'owner', 'spectating')
+
+    def __init__(self, sid, player_id):
+        self.sid = sid
+        self.player_id = player_id
+        self.game_id = None
+        self.symbol = None
+        self.variant = None
+        # Worker serializing the game's moves, None when it is this one
+        self.owner = None
+        self.spectating = None
+
+
+class ConnectionRegistry:
+    """Maps sid -> (player_id, game_id, symbol, variant, owner), filled at connect and join.
+
+    Move and disconnect handlers read identities and games from here instead
+    of the session or the `games` collection. Spectators are tracked per game
+    separately from the players' rooms.
+    """
+
+    def __init__(self):
+        self._connections = {}
+        self._rooms = {}
+        self._spectators = {}
+        self._lock = threading.Lock()
+
+    def connect(self, sid, player_id):
+        connection = Connection(sid, player_id)
+        with self._lock:
+            self._connections[sid] = connection
+        return connection
+
+    def get(self, sid):
+        return self._connections.get(sid)
+
+    def player(self, sid):
+        connection = self._connections.get(sid)
+        return connection.player_id if connection else None
+
+    def join(self, sid, game_id, symbol, variant='classic', owner=None):
+        game_id = str(game_id)
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                return
+            connection.game_id = game_id
+            connection.symbol = symbol
+            connection.variant = variant
+            connection.owner = owner
+            self._rooms.setdefault(game_id, set()).add(sid)
+
+    def end_game(self, game_id):
+        """Detach every local player and spectator socket from a finished game."""
+        game_id = str(game_id)
+        with self._lock:
+            for sid in self._spectators.pop(game_id, ()):
+                connection = self._connections.get(sid)
+                if connection and connection.spectating == game_id:
+                    connection.spectating = None
+            for sid in self._rooms.pop(game_id, ()):
+                connection = self._connections.get(sid)
+                if connection and connection.game_id == game_id:
+                    connection.game_id = None
+                    connection.symbol = None
+                    connection.variant = None
+                    connection.owner = None
+
+    def spectate(self, sid, game_id):
+        """Make a socket a read-only watcher of one game; returns the previous one."""
+        game_id = str(game_id)
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None:
+                return None
+            previous = connection.spectating
+            if previous:
+                self._leave(self._spectators, previous, sid)
+            connection.spectating = game_id
+            self._spectators.setdefault(game_id, set()).add(sid)
+            return previous
+
+    def stop_spectating(self, sid):
+        with self._lock:
+            connection = self._connections.get(sid)
+            if connection is None or connection.spectating is None:
+                return None
+            game_id, connection.spectating = connection.spectating, None
+            self._leave(self._spectators, game_id, sid)
+            return game_id
+
+    def spectator_count(self, game_id):
+        return len(self._spectators.get(str(game_id), ()))
+
+    @staticmethod
+    def _leave(rooms, game_id, sid):
+        room = rooms.get(game_id)
+        if room:
+            room.discard(sid)
+            if not room:
+                del rooms[game_id]
+
+    def disconnect(self, sid):
+        with self._lock:
+            connection = self._connections.pop(sid, None)
+            if connection and connection.game_id:
+                self._leave(self._rooms, connection.game_id, sid)
+            if connection and connection.spectating:
+                self._leave(self._spectators, connection.spectating, sid)
+            return connection
+
+    def stats(self):
+        with self._lock:
+            return {
+                'online_players': len({connection.player_id for connection in self._connections.values()}),
+                'connections': len(self._connections),
+                'active_rooms': len(self._rooms),
+                'spectators': sum(len(room) for room in self._spectators.values()),
+            }
@@ -1,119 +1,531 @@
+import logging
+from datetime import datetime
 from flask_socketio import emit, join_room, leave_room
 from flask import request, session
 from . import socketio
+from .connections import ConnectionRegistry
+from logs import get_logger, log_event
+from models.ai import bot_player, bot_difficulty, is_bot
+from models.board import VARIANTS
+from metrics import MOVE_LATENCY, SOCKET_EVENTS
+import health
 from bson import ObjectId
-import api.routes.user_routes as u
 import api.routes.leaderboard_routes as l
 
+# Identity and game of each connected socket, resolved once at connect/join
+CONNECTIONS = ConnectionRegistry()
+
+# game_id -> player_id of waiting games with a pending bot backfill timer
+BACKFILLS = {}
+
+LOG = get_logger('events')
+DEBUG, INFO, WARNING = logging.DEBUG, logging.INFO, logging.WARNING
+
 
 @socketio.on('connect')
 def handle_connect():
-    print('Player trying to connect', request.sid)
-
     player_id = session.get('username', None)
 
     if player_id is None:
-        print('None session', request.sid, player_id)
+        log_event(LOG, INFO, 'connect_rejected', sid=request.sid, reason='no_session')
+        SOCKET_EVENTS.inc('connect_rejected')
         emit('error', {'message': 'Please log in.'}, to=request.sid)
         return False
 
-    # Check if the player is already in a waiting or ongoing game
-    if GAMES.is_player_in_game(player_id):
+    if draining():
+        emit('error', {'message': 'Server is restarting, please reconnect.'}, to=request.sid)
+        SOCKET_EVENTS.inc('connect_rejected')
+        return False
+
+    # Check if the player is already in a waiting or ongoing game, unless it
+    # was handed off by a draining worker and can be resumed here
+    game, resumable = GAMES.resumable_game(player_id)
+    if game and not resumable:
         emit('error', {'message': 'You are already in a waiting or ongoing game.'}, to=request.sid)
+        SOCKET_EVENTS.inc('connect_rejected')
         return False
 
-    print('Client connected', request.sid, player_id)
+    CONNECTIONS.connect(request.sid, player_id)
+    SOCKET_EVENTS.inc('connect')
+    log_event(LOG, INFO, 'connected', sid=request.sid, player=player_id)
+    if resumable:
+        emit('game_resumable', {'game_id': str(game['_id'])}, to=request.sid)
     return True
 
 @socketio.on('connect_error')
 def handle_connect_error(e):
-    print('Error connecting', e)
+    log_event(LOG, WARNING, 'connect_error', error=str(e))
+
 
+def variant_info(variant):
+    size, win_length = VARIANTS[variant]
+    return {'variant': variant, 'size': size, 'win_length': win_length}
 
 @socketio.on('join_game')
-def handle_join_game():
-    print('player trying to join game', request.sid)
+def handle_join_game(data=None):
+    player_id = CONNECTIONS.player(request.sid)
+    if LOG.isEnabledFor(DEBUG):
+        log_event(LOG, DEBUG, 'join_game', sid=request.sid, player=player_id, data=data)
 
-    player_id = session.get('username', None)
-    print('Join game', player_id)
+    if draining():
+        emit('error', {'message': 'Server is restarting, please reconnect.'}, to=request.sid)
+        return False
 
     # Check if the player is already in a waiting or ongoing game
     if player_id and GAMES.is_player_in_game(player_id):
         emit('error', {'message': 'You are already in a waiting or ongoing game.'}, to=request.sid)
         return False
 
-    # Look for a waiting game
-    waiting_game = GAMES.search_games_by_status('waiting')
+    variant = (data or {}).get('variant', 'classic')
+    if variant not in VARIANTS:
+        emit('error', {'message': f'Unknown variant: {variant}'}, to=request.sid)
+        return False
+
+    # Pair with the oldest waiting player; a stale ticket (game already gone
+    # or claimed) simply fails the atomic claim and the next one is tried.
+    score = 0
+    if MATCHMAKER.skill_based:
+        stats = l.LEADERBOARD.get_user_stats(player_id)
+        score = stats['score'] if stats else 0
+
+    waiting_game = None
+    ticket = MATCHMAKER.pop(player_id, score, variant)
+    while ticket and not waiting_game:
+        waiting_game = GAMES.join_game(ticket.game_id, player_id)
+        if not waiting_game:
+            ticket = MATCHMAKER.pop(player_id, score, variant)
+    if not waiting_game and ROUTER:
+        waiting_game = claim_remote_game(player_id, score, variant)
+
     if waiting_game:
         # Join an existing waiting game.
         game_id = waiting_game['_id']
-        GAMES.join_game(game_id, player_id)
+        owner = ROUTER.owner_of(game_id) if ROUTER else None
         join_room(str(game_id))
-        emit('game_started', {'game_id': str(game_id), 'opponent': waiting_game['players']['player1']}, room=request.sid)
-        emit('opponent_joined', {'opponent': player_id}, room=str(game_id), skip_sid=request.sid)
+        CONNECTIONS.join(request.sid, game_id, 'O', variant, owner)
+        emit('game_started', {
+            'game_id': str(game_id),
+            'opponent': waiting_game['players']['player1'],
+            **variant_info(variant),
+        }, room=request.sid)
+        if owner:
+            # The owner starts its live copy before telling player1, so their first move is accepted
+            ROUTER.forward_join(owner, game_id, player_id, request.sid)
+        else:
+            start_joined_game(game_id, player_id, request.sid)
     else:
-        # Create a new game and join it.
-        game_id = GAMES.create_game(player_id)
+        # Create a new game, join it and wait in the queue.
+        game_id = GAMES.create_game(player_id, variant, score if MATCHMAKER.skill_based else None)
+        MATCHMAKER.enqueue(player_id, game_id, score, variant)
         join_room(str(game_id))
-        emit('game_joined', {'game_id': str(game_id), 'waiting': True}, room=request.sid)
+        CONNECTIONS.join(request.sid, game_id, 'X', variant)
+        emit('game_joined', {'game_id': str(game_id), 'waiting': True, **variant_info(variant)}, room=request.sid)
+        # The bot only plays the classic board
+        if BOT_SETTINGS['backfill_seconds'] and variant == 'classic':
+            BACKFILLS[str(game_id)] = player_id
+            socketio.start_background_task(backfill_with_bot, game_id, player_id)
+
+def claim_remote_game(player_id, score, variant):
+    """Pair with a player waiting on another worker, whose ticket is not in this worker's queue.
+
+    Candidates are the oldest waiting games in the collection, judged with
+    the same matchmaking rules as local tickets and claimed atomically.
+    """
+    now = datetime.utcnow()
+    for candidate in GAMES.waiting_games(player_id, variant):
+        if ROUTER.owner_of(candidate['_id']) is None:
+            continue  # This worker's own tickets were already tried
+        waited = (now - candidate['created_at']).total_seconds()
+        if not MATCHMAKER.accepts(candidate.get('score', 0), waited, score, variant):
+            continue
+        game = GAMES.join_game(candidate['_id'], player_id)
+        if game:
+            return game
+    return None
+
+def start_joined_game(game_id, player_id, sid):
+    """On the owner, once player2 has claimed the game: stop waiting and tell player1.
+
+    Also runs for joins forwarded from another worker.
+    """
+    game = GAMES.apply_join(game_id, player_id)
+    cancel_backfill(game_id)
+    if game:
+        MATCHMAKER.remove(game.player1, game_id)
+    socketio.emit('opponent_joined', {'opponent': player_id}, to=str(game_id), skip_sid=sid)
+    broadcast_to_spectators(game_id, 'opponent_joined', {'opponent': player_id})
+
+@socketio.on('join_bot_game')
+def handle_join_bot_game(data=None):
+    player_id = CONNECTIONS.player(request.sid)
+    if LOG.isEnabledFor(DEBUG):
+        log_event(LOG, DEBUG, 'join_bot_game', sid=request.sid, player=player_id, data=data)
+
+    if draining():
+        emit('error', {'message': 'Server is restarting, please reconnect.'}, to=request.sid)
+        return False
+
+    if player_id is None or GAMES.is_player_in_game(player_id):
+        emit('error', {'message': 'You are already in a waiting or ongoing game.'}, to=request.sid)
+        return False
+
+    try:
+        bot_id = bot_player((data or {}).get('difficulty', 'hard'))
+    except ValueError as e:
+        emit('error', {'message': str(e)}, to=request.sid)
+        return False
+
+    game_id = GAMES.create_bot_game(player_id, bot_id)
+    join_room(str(game_id))
+    CONNECTIONS.join(request.sid, game_id, 'X')
+    emit('game_started', {'game_id': str(game_id), 'opponent': bot_id, **variant_info('classic')}, room=request.sid)
+
+def backfill_with_bot(game_id, player_id):
+    """Seat a bot in a game that is still waiting once the backfill timeout passes.
+
+    The timer is cancelled when the game is joined or left (`cancel_backfill`).
+    The bot claims the game through the same atomic `join_game` as a human,
+    so if someone joined in the meantime the claim just fails. Only once the
+    bot has the seat is the player's ticket for this game dropped.
+    """
+    socketio.sleep(BOT_SETTINGS['backfill_seconds'])
+    if BACKFILLS.pop(str(game_id), None) is None:
+        return
+    bot_id = BOT_SETTINGS['bot_id']
+    if GAMES.join_game(game_id, bot_id):
+        MATCHMAKER.remove(player_id, game_id)
+        socketio.emit('opponent_joined', {'opponent': bot_id}, to=str(game_id))
+        broadcast_to_spectators(game_id, 'opponent_joined', {'opponent': bot_id})
+
+def cancel_backfill(game_id):
+    BACKFILLS.pop(str(game_id), None)
+
+def play_bot_turn(game_id, bot_id):
+    """Pick and play a bot's move in its own green thread, off the caller's handler."""
+    if BOT_SETTINGS['move_delay']:
+        socketio.sleep(BOT_SETTINGS['move_delay'])
+    game = GAMES.get_live_game(game_id)
+    if game is None or game.status != 'ongoing' or game.current_turn != bot_id:
+        return
+    play_move(game_id, bot_id, AI.choose_move(game.board, bot_difficulty(bot_id)), None)
 
 @socketio.on('make_move')
 def handle_make_move(data):
-    print('Player trying to make move', request.sid, session.get('username'))
-    print('Make move', data)
+    connection = CONNECTIONS.get(request.sid)
+    player_id = connection.player_id if connection else None
+    if LOG.isEnabledFor(DEBUG):
+        log_event(LOG, DEBUG, 'make_move', sid=request.sid, player=player_id, game_id=data.get('game_id'), position=data.get('position'))
     try:
         game_id = ObjectId(data['game_id'])
-        player_id = session.get('username')
-        position = data['position']
-
-        game = GAMES.get_game(game_id)
-
-        if game and game['status'] == 'ongoing' and game['current_turn'] == player_id:
-            if game['board'][position] == '':
-                game_over = GAMES.process_move(game, game_id, player_id, position)
-                emit('move_made', {'player': player_id, 'position': position}, room=str(game_id), skip_sid=request.sid)
-                if game_over:
-                    # game_over => {'result': 'win', 'winner': winner_id}
-                    # or
-                    # game_over => {'result': 'draw'}
-                    emit('game_over', game_over, room=str(game_id))
-                    print('Game over', game_over)
-                    leave_room(str(game_id))
-
-                    if game_over['result'] == 'win':
-                        u.USER.increment_wins(game_over['winner'])
-                        l.LEADERBOARD.update_wins(game_over['winner'])
-                        loser = game['players']['player1'] if game_over['winner'] == game['players']['player2'] else game['players']['player2']
-                        u.USER.increment_losses(loser)
-                    else:
-                        # Update user stats for a draw
-                        u.USER.increment_draws(game['players']['player1'])
-                        u.USER.increment_draws(game['players']['player2'])
-
-                        # update leaderboard for a draw
-                        l.LEADERBOARD.update_draws(game['players']['player1'])
-                        l.LEADERBOARD.update_draws(game['players']['player2'])
+        if connection is None or connection.game_id != str(game_id):
+            raise ValueError("You are not playing this game.")
+        # Cells are addressed by flat `position` or by `row` and `col`
+        if 'position' in data:
+            position = int(data['position'])
+        else:
+            size = VARIANTS[connection.variant][0]
+            row, col = int(data['row']), int(data['col'])
+            if not (0 <= row < size and 0 <= col < size):
+                raise ValueError("Invalid position.")
+            position = row * size + col
+
+        # Moves are serialized on the worker that owns the game
+        owner = connection.owner
+        if owner:
+            ROUTER.forward_move(owner, game_id, player_id, position, request.sid)
+        else:
+            play_move(game_id, player_id, position, request.sid)
     except Exception as e:
         emit('error', {'message': f'An error occurred while making the move: {str(e)}'}, to=request.sid)
 
+def play_move(game_id, player_id, position, sid):
+    """Apply a move on the owning worker and broadcast the outcome.
+
+    Also runs for moves forwarded from another worker, so it only uses the
+    server-level emit API and needs no request context.
+    """
+    game_id = ObjectId(game_id)
+    try:
+        game_over, game = GAMES.make_move(game_id, player_id, position)
+    except Exception as e:
+        if LOG.isEnabledFor(DEBUG):
+            log_event(LOG, DEBUG, 'move_rejected', game_id=str(game_id), player=player_id, position=position, error=str(e))
+        socketio.emit('error', {'message': f'An error occurred while making the move: {str(e)}'}, to=sid)
+        return
+
+    move = {'player': player_id, 'position': position, 'variant': game.variant, 'ply': len(game.moves) - 1}
+    with MOVE_LATENCY.time('broadcast'):
+        socketio.emit('move_made', move, to=str(game_id), skip_sid=sid)
+        broadcast_to_spectators(game_id, 'move_made', move)
+    if game_over:
+        # game_over => {'result': 'win', 'winner': winner_id}
+        # or
+        # game_over => {'result': 'draw'}
+        socketio.emit('game_over', game_over, to=str(game_id))
+        broadcast_to_spectators(game_id, 'game_over', game_over, close=True)
+        log_event(LOG, INFO, 'game_over', game_id=str(game_id), **game_over)
+        if sid:
+            socketio.server.leave_room(sid, str(game_id), namespace='/')
+        CONNECTIONS.end_game(game_id)
+
+        # Update user stats and leaderboard; games against a bot are not ranked
+        if is_bot(game.player1) or is_bot(game.player2):
+            return
+        if game_over['result'] == 'win':
+            SETTLEMENT.settle_win(game_over['winner'], game.opponent_of(game_over['winner']))
+        else:
+            SETTLEMENT.settle_draw(game.player1, game.player2)
+    elif is_bot(game.current_turn):
+        socketio.start_background_task(play_bot_turn, game_id, game.current_turn)
+
 @socketio.on('disconnect')
 def handle_disconnect():
-    print('Player trying to disconnect', request.sid)
+    connection = CONNECTIONS.disconnect(request.sid)
+    SOCKET_EVENTS.inc('disconnect')
+    if connection is None:
+        return
+    player_id = connection.player_id
+    log_event(LOG, INFO, 'disconnected', sid=request.sid, player=player_id, game_id=connection.game_id)
+    MATCHMAKER.remove(player_id)
+    # While draining, games are handed off rather than forfeited
+    if connection.game_id is None or draining():
+        return
+    cancel_backfill(connection.game_id)
+    # Only the owner may end the game: it holds the live state and settles it
+    if connection.owner:
+        ROUTER.forward_disconnect(connection.owner, connection.game_id, player_id, request.sid)
+    else:
+        forfeit_game(connection.game_id, player_id, request.sid)
+    leave_room(connection.game_id)
 
-    player_id = session.get('username')
-    print('Client disconnected', request.sid, player_id)
-    game = GAMES.handle_disconnect(player_id)
+def forfeit_game(game_id, player_id, sid):
+    """On the owner, end a player's game after they disconnect: the opponent wins.
+
+    Also runs for disconnects forwarded from another worker.
+    """
+    game = GAMES.handle_disconnect(player_id, game_id)
     if game:
-        emit('game_over', {
+        game_over = {
             'result': 'win',
             'winner': game['winner'],
             'reason': 'opponent_disconnected'
-        }, room=game['_id'], skip_sid=request.sid)
-        leave_room(game['_id'])
-        u.USER.increment_wins(game['winner'])
-        l.LEADERBOARD.update_wins(game['winner'])
-        u.USER.increment_losses(player_id)
-
-def init_game_model(game_model):
-    global GAMES
+        }
+        socketio.emit('game_over', game_over, to=game['_id'], skip_sid=sid)
+        broadcast_to_spectators(game['_id'], 'game_over', game_over, close=True)
+        CONNECTIONS.end_game(game['_id'])
+        if not is_bot(game['winner']):
+            SETTLEMENT.settle_win(game['winner'], player_id)
+
+@socketio.on('resume_game')
+def handle_resume_game(data):
+    player_id = CONNECTIONS.player(request.sid)
+    try:
+        if player_id is None:
+            raise ValueError("Please log in.")
+        if draining():
+            raise ValueError("Server is restarting, please reconnect.")
+        game_id = ObjectId(data['game_id'])
+        game, owner = GAMES.resume_game(game_id, player_id)
+        if game is None:
+            raise ValueError("There is no game to resume.")
+    except Exception as e:
+        emit('error', {'message': f'An error occurred while resuming the game: {str(e)}'}, to=request.sid)
+        return False
+
+    symbol = game.symbol_for(player_id)
+    join_room(str(game_id))
+    CONNECTIONS.join(request.sid, game_id, symbol, game.variant, owner)
+    emit('game_resumed', {
+        'game_id': str(game_id),
+        'opponent': game.opponent_of(player_id),
+        'symbol': symbol,
+        'current_turn': game.current_turn,
+        'moves': [{'ply': move['p'], 'position': move['c']} for move in game.moves],
+        **variant_info(game.variant),
+    }, to=request.sid)
+    log_event(LOG, INFO, 'game_resumed', sid=request.sid, player=player_id, game_id=str(game_id))
+    # A bot whose turn it was when the game was handed off moves once its owner holds it again
+    if is_bot(game.current_turn) and GAMES.get_live_game(game_id):
+        socketio.start_background_task(play_bot_turn, game_id, game.current_turn)
+
+def sweep_handoffs(handoff_ttl, interval):
+    """Every `interval` seconds, end handed-off games not resumed within `handoff_ttl`.
+
+    Without this an abandoned handoff would stay 'ongoing' and keep both
+    players out of new games. The player who came back wins by forfeit.
+    """
+    while not draining():
+        socketio.sleep(interval)
+        try:
+            forfeited = GAMES.expire_handoffs(handoff_ttl)
+        except Exception:
+            LOG.exception('handoff_sweep_failed')
+            continue
+        for game in forfeited:
+            game_over = {'result': 'win', 'winner': game['winner'], 'reason': 'opponent_did_not_return'}
+            socketio.emit('game_over', game_over, to=game['_id'])
+            broadcast_to_spectators(game['_id'], 'game_over', game_over, close=True)
+            CONNECTIONS.end_game(game['_id'])
+            log_event(LOG, INFO, 'handoff_forfeited', game_id=game['_id'], winner=game['winner'], loser=game['loser'])
+            SETTLEMENT.settle_win(game['winner'], game['loser'])
+
+def draining():
+    return health.HEALTH is not None and health.HEALTH.draining
+
+def drain(grace_period):
+    """Stop taking players and hand this worker's rooms off before shutdown.
+
+    Readiness fails at once so the load balancer stops sending players
+    here. Pending settlements are written, waiting games are cancelled and
+    ongoing ones are handed off (see `Game.hand_off`). Every room then gets
+    `server_draining`, telling its players whether to resume the game after
+    reconnecting, and the worker keeps serving for `grace_period` seconds so
+    the sockets can move before it exits.
+    """
+    health.HEALTH.draining = True
+    SETTLEMENT.flush()
+    ongoing, waiting = GAMES.hand_off()
+    for game in waiting:
+        cancel_backfill(game.game_id)
+        MATCHMAKER.remove(game.player1, game.game_id)
+    for game, resume in [(game, True) for game in ongoing] + [(game, False) for game in waiting]:
+        notice = {'game_id': game.game_id, 'resume': resume, 'grace_period': grace_period}
+        socketio.emit('server_draining', notice, to=game.game_id)
+        broadcast_to_spectators(game.game_id, 'server_draining', notice, close=True)
+        CONNECTIONS.end_game(game.game_id)
+    log_event(LOG, WARNING, 'draining', ongoing=len(ongoing), waiting=len(waiting), grace_period=grace_period)
+    socketio.sleep(grace_period)
+
+def spectator_room(game_id):
+    return f'spectate:{game_id}'
+
+def broadcast_to_spectators(game_id, event, payload, close=False):
+    """Fan an event out to a game's spectators after the players got it.
+
+    Spectators get one room emit per event, encoded once for the whole room,
+    from a background task, so however many are watching the players'
+    handler returns just as fast. With several workers spectators may sit on
+    any of them, so the emit is always sent.
+    """
+    if not ROUTER and not CONNECTIONS.spectator_count(game_id):
+        return
+    socketio.start_background_task(_emit_to_spectators, str(game_id), event, payload, close)
+
+def _emit_to_spectators(game_id, event, payload, close):
+    room = spectator_room(game_id)
+    socketio.emit(event, dict(payload, game_id=game_id), to=room)
+    if close:
+        socketio.close_room(room)
+
+def _iso(value):
+    return value.isoformat() if value else None
+
+def spectate_snapshot(game_id):
+    """Current state of a game for a new spectator, or None if it does not exist."""
+    game = GAMES.get_live_game(game_id)
+    if game is not None:
+        return {
+            'game_id': game.game_id,
+            'players': game.players,
+            'status': game.status,
+            'current_turn': game.current_turn,
+            'moves': [{'ply': move['p'], 'position': move['c']} for move in game.moves],
+            **variant_info(game.variant),
+        }
+    # Held by another worker: the stored log trails the live game by at most a flush interval
+    replay = GAMES.get_replay(game_id)
+    if replay is None:
+        return None
+    return {
+        'game_id': replay['game_id'],
+        'players': replay['players'],
+        'status': replay['status'],
+        'moves': [{'ply': move['ply'], 'position': move['position']} for move in replay['moves']],
+        **variant_info(replay['variant']),
+    }
+
+@socketio.on('spectate')
+def handle_spectate(data):
+    connection = CONNECTIONS.get(request.sid)
+    try:
+        if connection is None:
+            raise ValueError("Please log in.")
+        if connection.game_id:
+            raise ValueError("You cannot spectate while playing.")
+        game_id = ObjectId(data['game_id'])
+        snapshot = spectate_snapshot(game_id)
+        if snapshot is None or snapshot['status'] == 'completed':
+            raise ValueError("Game is not in progress.")
+    except Exception as e:
+        emit('error', {'message': f'An error occurred while joining as spectator: {str(e)}'}, to=request.sid)
+        return False
+
+    previous = CONNECTIONS.spectate(request.sid, game_id)
+    if previous:
+        leave_room(spectator_room(previous))
+    join_room(spectator_room(game_id))
+    # Moves already in the snapshot may still arrive as `move_made`; clients skip known plies
+    emit('spectate_started', snapshot, to=request.sid)
+
+@socketio.on('stop_spectating')
+def handle_stop_spectating():
+    game_id = CONNECTIONS.stop_spectating(request.sid)
+    if game_id:
+        leave_room(spectator_room(game_id))
+
+@socketio.on('watch_replay')
+def handle_watch_replay(data):
+    try:
+        game_id = ObjectId(data['game_id'])
+        speed = float(data.get('speed', 1))
+        if not speed > 0:
+            raise ValueError("Speed must be positive.")
+        replay = GAMES.get_replay(game_id)
+        if replay is None:
+            raise ValueError("Game not found.")
+        if replay['status'] != 'completed':
+            raise ValueError("Only finished games can be replayed.")
+    except Exception as e:
+        emit('error', {'message': f'An error occurred while starting the replay: {str(e)}'}, to=request.sid)
+        return False
+
+    socketio.start_background_task(stream_replay, replay, min(speed, REPLAY_SETTINGS['max_speed']), request.sid)
+
+def stream_replay(replay, speed, sid):
+    """Stream a finished game's moves to one socket, paced like the original.
+
+    The pause before each move is the real time between the two moves,
+    capped at `max_delay` (also used when the times are unknown) and divided
+    by `speed`. Stops early if the socket disconnects.
+    """
+    moves = replay.pop('moves')
+    replay.update({
+        'created_at': _iso(replay['created_at']),
+        'ended_at': _iso(replay['ended_at']),
+        'total_moves': len(moves),
+        'speed': speed,
+    })
+    socketio.emit('replay_started', replay, to=sid)
+
+    max_delay = REPLAY_SETTINGS['max_delay']
+    previous = None
+    for move in moves:
+        played_at = move['played_at']
+        if move['ply']:
+            gap = (played_at - previous).total_seconds() if played_at and previous else 0
+            socketio.sleep((min(gap, max_delay) if gap > 0 else max_delay) / speed)
+            if CONNECTIONS.get(sid) is None:
+                return
+        previous = played_at
+        socketio.emit('replay_move', dict(move, played_at=_iso(played_at)), to=sid)
+    socketio.emit('replay_finished', {'game_id': replay['game_id']}, to=sid)
+
+def init_game_model(game_model, matchmaker, settlement, ai, bot_settings, replay_settings, router=None):
+    global GAMES, MATCHMAKER, SETTLEMENT, AI, BOT_SETTINGS, REPLAY_SETTINGS, ROUTER
     GAMES = game_model
+    MATCHMAKER = matchmaker
+    SETTLEMENT = settlement
+    AI = ai
+    BOT_SETTINGS = bot_settings
+    REPLAY_SETTINGS = replay_settings
+    ROUTER = router
@@ -0,0 +1,262 @@
+"""In-memory matchmaking queue for multiplayer games."""
+import bisect
+import threading
+import time
+from collections import OrderedDict
+from metrics import MATCHMAKING_WAIT
+
+
+class Ticket:
+    """A player waiting in their own freshly created game."""
+
+    __slots__ = ('player_id', 'game_id', 'score', 'enqueued_at')
+
+    def __init__(self, player_id, game_id, score=0):
+        self.player_id = player_id
+        self.game_id = game_id
+        self.score = score
+        self.enqueued_at = time.monotonic()
+
+    def waited(self, now=None):
+        return (now if now is not None else time.monotonic()) - self.enqueued_at
+
+
+class Matchmaker:
+    """FIFO queue of waiting games, keyed by player for O(1) removal.
+
+    Pairing pops the oldest ticket in O(1); the actual claim is done by
+    `Game.join_game`, whose conditional update guarantees each waiting game
+    is claimed once even if a ticket is stale.
+    """
+
+    skill_based = False
+
+    def __init__(self):
+        self._queue = OrderedDict()
+        self._lock = threading.Lock()
+        self.matched = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def __len__(self):
+        return len(self._queue)
+
+    def enqueue(self, player_id, game_id, score=0):
+        ticket = Ticket(player_id, game_id, score)
+        with self._lock:
+            self._queue[player_id] = ticket
+        return ticket
+
+    def pop(self, player_id=None, score=0):
+        """Take the oldest ticket that does not belong to `player_id`.
+
+        A player holds at most one ticket, so at most two are looked at and
+        the caller's own keeps its place in the queue.
+        """
+        with self._lock:
+            for queued in self._queue:
+                if queued != player_id:
+                    ticket = self._queue.pop(queued)
+                    self._record_wait(ticket.waited())
+                    return ticket
+            return None
+
+    def remove(self, player_id, game_id=None):
+        """Drop a player's ticket, e.g. when they disconnect while waiting.
+
+        With `game_id`, only a ticket for that game is dropped, so one the
+        player queued since then is kept.
+        """
+        with self._lock:
+            if not self._holds(player_id, game_id):
+                return None
+            return self._queue.pop(player_id)
+
+    def accepts(self, score, waited, joiner_score):
+        """Whether a player waiting `waited` seconds would be paired with `joiner_score`."""
+        return True
+
+    def _holds(self, player_id, game_id):
+        ticket = self._queue.get(player_id)
+        return ticket is not None and (game_id is None or str(ticket.game_id) == str(game_id))
+
+    def _record_wait(self, waited):
+        self.matched += 1
+        self._total_wait += waited
+        self._max_wait = max(self._max_wait, waited)
+
+    def stats(self):
+        """Queue depth and wait-time figures for monitoring."""
+        now = time.monotonic()
+        with self._lock:
+            oldest = next(iter(self._queue.values()), None)
+            return {
+                'queue_depth': len(self._queue),
+                'matched': self.matched,
+                'avg_wait_seconds': self._total_wait / self.matched if self.matched else 0.0,
+                'max_wait_seconds': self._max_wait,
+                'oldest_wait_seconds': oldest.waited(now) if oldest else 0.0,
+            }
+
+
+class SkillMatchmaker(Matchmaker):
+    """Pairs players with the closest leaderboard score first.
+
+    Waiting tickets are bucketed by `score // bucket_width`; the non-empty
+    bucket keys are kept sorted so the joiner's position is found with a
+    bisect and candidates are visited nearest bucket first. A waiting player
+    accepts opponents one bucket further away for every `widen_seconds` they
+    have waited, and anyone at all after `max_wait` seconds. Only the oldest
+    ticket of each bucket is examined, since it has the widest window, and
+    only buckets within the window of the oldest ticket in the whole queue
+    are visited, since no ticket accepts anyone further away.
+    """
+
+    skill_based = True
+
+    def __init__(self, bucket_width=10, widen_seconds=5.0, max_wait=30.0):
+        super().__init__()
+        self.bucket_width = max(1, bucket_width)
+        self.widen_seconds = widen_seconds
+        self.max_wait = max_wait
+        self._buckets = {}
+        self._keys = []
+
+    def _bucket(self, score):
+        return max(0, score) // self.bucket_width
+
+    def enqueue(self, player_id, game_id, score=0):
+        ticket = Ticket(player_id, game_id, score)
+        bucket = self._bucket(score)
+        with self._lock:
+            self._discard(player_id)
+            self._queue[player_id] = ticket
+            if bucket not in self._buckets:
+                self._buckets[bucket] = OrderedDict()
+                bisect.insort(self._keys, bucket)
+            self._buckets[bucket][player_id] = ticket
+        return ticket
+
+    def _window(self, ticket, now):
+        """How many buckets away a waiting ticket is willing to match."""
+        waited = ticket.waited(now)
+        if waited >= self.max_wait:
+            return float('inf')
+        return waited / self.widen_seconds if self.widen_seconds > 0 else float('inf')
+
+    def accepts(self, score, waited, joiner_score):
+        if waited >= self.max_wait or self.widen_seconds <= 0:
+            return True
+        return abs(self._bucket(score) - self._bucket(joiner_score)) <= waited / self.widen_seconds
+
+    def _oldest_in(self, bucket, player_id):
+        for ticket in self._buckets[bucket].values():
+            if ticket.player_id != player_id:
+                return ticket
+        return None
+
+    def pop(self, player_id=None, score=0):
+        """Take the nearest-scored ticket whose window covers the joiner."""
+        now = time.monotonic()
+        mine = self._bucket(score)
+        with self._lock:
+            oldest = next(iter(self._queue.values()), None)
+            if oldest is None:
+                return None
+            reach = self._window(oldest, now)
+            if reach == float('inf'):
+                low, high = 0, len(self._keys)
+            else:
+                low = bisect.bisect_left(self._keys, mine - reach)
+                high = bisect.bisect_right(self._keys, mine + reach)
+            right = bisect.bisect_left(self._keys, mine)
+            left = right - 1
+            while left >= low or right < high:
+                # Visit buckets in order of distance from the joiner's bucket.
+                if right >= high or (left >= low and mine - self._keys[left] <= self._keys[right] - mine):
+                    bucket, left = self._keys[left], left - 1
+                else:
+                    bucket, right = self._keys[right], right + 1
+
+                ticket = self._oldest_in(bucket, player_id)
+                if ticket and abs(bucket - mine) <= self._window(ticket, now):
+                    self._discard(ticket.player_id)
+                    self._record_wait(ticket.waited(now))
+                    return ticket
+        return None
+
+    def remove(self, player_id, game_id=None):
+        with self._lock:
+            if not self._holds(player_id, game_id):
+                return None
+            return self._discard(player_id)
+
+    def _discard(self, player_id):
+        ticket = self._queue.pop(player_id, None)
+        if ticket is None:
+            return None
+        bucket = self._bucket(ticket.score)
+        tickets = self._buckets[bucket]
+        del tickets[player_id]
+        if not tickets:
+            del self._buckets[bucket]
+            del self._keys[bisect.bisect_left(self._keys, bucket)]
+        return ticket
+
+
+class MatchmakerPool:
+    """One matchmaker per board variant, so players only meet on the same board.
+
+    Queues are created on first use with `factory()`; the pool exposes the
+    same `enqueue`/`pop`/`accepts`/`remove`/`stats` interface with a
+    `variant` argument.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self._matchmakers = {'classic': factory()}
+        self.skill_based = self._matchmakers['classic'].skill_based
+        self._variants = {}
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return sum(len(matchmaker) for matchmaker in list(self._matchmakers.values()))
+
+    def _for(self, variant):
+        with self._lock:
+            matchmaker = self._matchmakers.get(variant)
+            if matchmaker is None:
+                matchmaker = self._matchmakers[variant] = self.factory()
+            return matchmaker
+
+    def enqueue(self, player_id, game_id, score=0, variant='classic'):
+        previous = self._variants.get(player_id)
+        if previous is not None and previous != variant:
+            self._for(previous).remove(player_id)
+        self._variants[player_id] = variant
+        return self._for(variant).enqueue(player_id, game_id, score)
+
+    def pop(self, player_id=None, score=0, variant='classic'):
+        ticket = self._for(variant).pop(player_id, score)
+        if ticket:
+            self._variants.pop(ticket.player_id, None)
+            MATCHMAKING_WAIT.observe(ticket.waited(), variant)
+        return ticket
+
+    def accepts(self, score, waited, joiner_score, variant='classic'):
+        return self._for(variant).accepts(score, waited, joiner_score)
+
+    def remove(self, player_id, game_id=None):
+        variant = self._variants.get(player_id)
+        if variant is None:
+            return None
+        ticket = self._for(variant).remove(player_id, game_id)
+        if ticket:
+            self._variants.pop(player_id, None)
+        return ticket
+
+    def stats(self):
+        """Figures of every variant queue, keyed by variant."""
+        with self._lock:
+            matchmakers = dict(self._matchmakers)
+        return {variant: matchmaker.stats() for variant, matchmaker in matchmakers.items()}
@@ -0,0 +1,186 @@
+"""Multi-worker support: a pluggable message broker and game sharding.
+
+Games are sharded over the configured `WORKERS` by hashing the game id, and
+a worker mints the ids of the games it creates so they hash to itself: the
+game's live state stays in its creator's registry and its moves are
+serialized there, and any worker can tell a game's owner without a query.
+Room broadcasts fan out to the other workers through the broker, a move
+that reaches a worker that does not own the game is forwarded to the
+owner's channel, and so are a player joining it and a player leaving it
+from another worker.
+Leaderboard changes are mirrored into every worker's ranking the same way.
+"""
+import hashlib
+import json
+import pickle
+import queue
+import threading
+from bson import ObjectId
+from socketio import PubSubManager
+from logs import get_logger
+
+LOG = get_logger('scaling')
+
+
+class LocalBroker:
+    """In-process publish/subscribe, for tests and single-host setups."""
+
+    def __init__(self):
+        self._subscribers = {}
+        self._lock = threading.Lock()
+
+    def publish(self, channel, message):
+        with self._lock:
+            subscribers = list(self._subscribers.get(channel, ()))
+        for subscriber in subscribers:
+            subscriber.put(message)
+
+    def listen(self, channel):
+        subscriber = queue.Queue()
+        with self._lock:
+            self._subscribers.setdefault(channel, []).append(subscriber)
+        while True:
+            yield subscriber.get()
+
+
+class RedisBroker:
+    """Publish/subscribe over Redis channels."""
+
+    def __init__(self, url):
+        import redis
+        self.redis = redis.Redis.from_url(url)
+
+    def publish(self, channel, message):
+        self.redis.publish(channel, message)
+
+    def listen(self, channel):
+        pubsub = self.redis.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(channel)
+        for message in pubsub.listen():
+            if message['type'] == 'message':
+                yield message['data']
+
+
+_local_broker = LocalBroker()
+
+
+def create_broker(url):
+    """Broker for a `SOCKETIO_MESSAGE_QUEUE` URL (`local://` or `redis://`)."""
+    if url.startswith('local://'):
+        return _local_broker
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisBroker(url)
+    raise ValueError(f"Unsupported message queue: {url}")
+
+
+class BrokerManager(PubSubManager):
+    """Socket.IO client manager that fans room emits out through a broker."""
+
+    name = 'broker'
+
+    def __init__(self, broker, channel='tictactoe-socketio', write_only=False):
+        self.broker = broker
+        super().__init__(channel=channel, write_only=write_only)
+
+    def _publish(self, data):
+        self.broker.publish(self.channel, pickle.dumps(data))
+
+    def _listen(self):
+        yield from self.broker.listen(self.channel)
+
+
+def shard_of(game_id, workers):
+    """Worker owning `game_id`, by rendezvous hashing over `workers`.
+
+    Adding or removing a worker only moves the games hashed to that worker.
+    """
+    key = str(game_id).encode()
+    return max(workers, key=lambda worker: hashlib.blake2b(worker.encode() + b'/' + key, digest_size=8).digest())
+
+
+class GameRouter:
+    """Shards games over the workers and forwards work to a game's owner."""
+
+    def __init__(self, broker, worker_id, workers):
+        if worker_id not in workers:
+            raise ValueError(f"WORKER_ID {worker_id} is not listed in WORKERS")
+        self.broker = broker
+        self.worker_id = worker_id
+        self.workers = tuple(workers)
+
+    @staticmethod
+    def channel(worker_id):
+        return f'tictactoe-worker:{worker_id}'
+
+    def owner_of(self, game_id):
+        """Worker that owns a game, or None when it is this one."""
+        owner = shard_of(game_id, self.workers)
+        return owner if owner != self.worker_id else None
+
+    def new_game_id(self):
+        """A fresh ObjectId that hashes to this worker (about len(workers) draws)."""
+        while True:
+            game_id = ObjectId()
+            if shard_of(game_id, self.workers) == self.worker_id:
+                return game_id
+
+    def _forward(self, owner, kind, **fields):
+        self.broker.publish(self.channel(owner), json.dumps(dict(fields, kind=kind)))
+
+    def forward_move(self, owner, game_id, player_id, position, sid):
+        self._forward(owner, 'move', game_id=str(game_id), player_id=player_id, position=position, sid=sid)
+
+    def forward_join(self, owner, game_id, player_id, sid):
+        self._forward(owner, 'join', game_id=str(game_id), player_id=player_id, sid=sid)
+
+    def forward_disconnect(self, owner, game_id, player_id, sid):
+        self._forward(owner, 'disconnect', game_id=str(game_id), player_id=player_id, sid=sid)
+
+    def listen(self, handlers):
+        """Apply forwarded work with `handlers[kind](**message)`; runs forever."""
+        for message in self.broker.listen(self.channel(self.worker_id)):
+            try:
+                message = json.loads(message)
+                handlers[message.pop('kind', 'move')](**message)
+            except Exception:
+                LOG.exception('forwarded_message_failed')
+
+
+class RankingSync:
+    """Mirrors leaderboard changes into every worker's in-memory ranking.
+
+    Each worker publishes the leaderboard documents it writes and the others
+    apply them to their `ScoreRanking`. Documents are absolute, so a repeated
+    message is harmless, and wins and draws only grow, so a document older
+    than the entry already held is ignored.
+    """
+
+    channel = 'tictactoe-ranking'
+
+    def __init__(self, broker, worker_id):
+        self.broker = broker
+        self.worker_id = worker_id
+
+    def publish_set(self, entry):
+        self.broker.publish(self.channel, json.dumps({'worker': self.worker_id, 'entry': entry}, default=str))
+
+    def publish_remove(self, username):
+        self.broker.publish(self.channel, json.dumps({'worker': self.worker_id, 'remove': username}))
+
+    def listen(self, ranking):
+        """Apply other workers' changes to `ranking`; runs forever."""
+        for message in self.broker.listen(self.channel):
+            try:
+                message = json.loads(message)
+                if message['worker'] == self.worker_id:
+                    continue
+                if 'remove' in message:
+                    ranking.remove(message['remove'])
+                    continue
+                entry = message['entry']
+                held = ranking.get(entry['username'])
+                if held and held['wins'] + held['draws'] > entry.get('wins', 0) + entry.get('draws', 0):
+                    continue
+                ranking.set(entry)
+            except Exception:
+                LOG.exception('ranking_sync_failed')
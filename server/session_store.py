@@ -0,0 +1,181 @@
+"""
+Server-side session storage with an in-memory LRU tier.
+
+`SESSION_BACKEND` selects where sessions live:
+
+- `filesystem`: Flask-Session files on local disk (the original setup).
+- `memory`: process-local LRU only; fastest, but not shared between workers.
+- `mongodb`: shared `sessions` collection behind a per-worker LRU tier.
+- `cookie`: Flask's signed, stateless cookies; nothing is stored server-side.
+"""
+import secrets
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from flask.sessions import SessionInterface, SessionMixin
+from itsdangerous import BadSignature, Signer
+from werkzeug.datastructures import CallbackDict
+
+
+class MemoryLRUStore:
+    """Bounded in-process session store with per-entry expiry."""
+
+    def __init__(self, maxsize=10000, ttl=5400):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, sid):
+        with self._lock:
+            item = self._data.get(sid)
+            if item is None:
+                return None
+            data, expires_at = item
+            if expires_at < time.monotonic():
+                del self._data[sid]
+                return None
+            self._data.move_to_end(sid)
+            return data
+
+    def set(self, sid, data, ttl=None):
+        with self._lock:
+            self._data[sid] = (data, time.monotonic() + (ttl or self.ttl))
+            self._data.move_to_end(sid)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, sid):
+        with self._lock:
+            self._data.pop(sid, None)
+
+
+class MongoSessionStore:
+    """Sessions shared between workers in a `sessions` collection.
+
+    Expired documents are removed by a TTL index on `expires_at`.
+    """
+
+    def __init__(self, collection, ttl=5400):
+        self.collection = collection
+        self.ttl = ttl
+        self.collection.create_index('expires_at', expireAfterSeconds=0)
+
+    def get(self, sid):
+        document = self.collection.find_one({'_id': sid, 'expires_at': {'$gt': datetime.utcnow()}})
+        return document['data'] if document else None
+
+    def set(self, sid, data, ttl=None):
+        expires_at = datetime.utcnow() + timedelta(seconds=ttl or self.ttl)
+        self.collection.replace_one({'_id': sid}, {'_id': sid, 'data': data, 'expires_at': expires_at}, upsert=True)
+
+    def delete(self, sid):
+        self.collection.delete_one({'_id': sid})
+
+
+class TieredSessionStore:
+    """Read-through LRU in front of a shared store; writes go to both."""
+
+    def __init__(self, memory, shared):
+        self.memory = memory
+        self.shared = shared
+
+    def get(self, sid):
+        data = self.memory.get(sid)
+        if data is None:
+            data = self.shared.get(sid)
+            if data is not None:
+                self.memory.set(sid, data)
+        return data
+
+    def set(self, sid, data, ttl=None):
+        # The memory tier keeps its own short TTL, bounding how long another
+        # worker's logout can go unnoticed here.
+        self.shared.set(sid, data, ttl)
+        self.memory.set(sid, data)
+
+    def delete(self, sid):
+        self.memory.delete(sid)
+        self.shared.delete(sid)
+
+
+class ServerSession(CallbackDict, SessionMixin):
+    """Session dict that tracks modifications."""
+
+    def __init__(self, initial=None, sid=None, new=False):
+        def on_update(self):
+            self.modified = True
+        super().__init__(initial, on_update)
+        self.sid = sid
+        self.new = new
+        self.modified = False
+
+
+class StoreSessionInterface(SessionInterface):
+    """Keeps session data in a store; the cookie only carries a signed id."""
+
+    def __init__(self, store):
+        self.store = store
+
+    def _signer(self, app):
+        return Signer(app.secret_key, salt='tictactoe-session')
+
+    def open_session(self, app, request):
+        cookie = request.cookies.get(self.get_cookie_name(app))
+        if cookie:
+            try:
+                sid = self._signer(app).unsign(cookie).decode()
+            except BadSignature:
+                sid = None
+            if sid:
+                data = self.store.get(sid)
+                if data is not None:
+                    return ServerSession(data, sid=sid)
+        return ServerSession(sid=secrets.token_urlsafe(32), new=True)
+
+    def save_session(self, app, session, response):
+        name = self.get_cookie_name(app)
+        domain = self.get_cookie_domain(app)
+        path = self.get_cookie_path(app)
+        if not session:
+            if session.modified:
+                self.store.delete(session.sid)
+                response.delete_cookie(name, domain=domain, path=path)
+            return
+
+        if not self.should_set_cookie(app, session):
+            return
+
+        ttl = int(app.permanent_session_lifetime.total_seconds())
+        self.store.set(session.sid, dict(session), ttl)
+        response.set_cookie(
+            name,
+            self._signer(app).sign(session.sid).decode(),
+            expires=self.get_expiration_time(app, session),
+            httponly=self.get_cookie_httponly(app),
+            domain=domain,
+            path=path,
+            secure=self.get_cookie_secure(app),
+            samesite=self.get_cookie_samesite(app),
+        )
+
+
+def init_session(app):
+    """Install the session backend selected by `SESSION_BACKEND`."""
+    backend = app.config['SESSION_BACKEND']
+    ttl = int(app.config['PERMANENT_SESSION_LIFETIME'].total_seconds())
+
+    if backend == 'filesystem':
+        from flask_session import Session
+        app.config['SESSION_TYPE'] = 'filesystem'
+        Session(app)
+    elif backend == 'memory':
+        app.session_interface = StoreSessionInterface(MemoryLRUStore(app.config['SESSION_CACHE_SIZE'], ttl))
+    elif backend == 'mongodb':
+        app.session_interface = StoreSessionInterface(TieredSessionStore(
+            MemoryLRUStore(app.config['SESSION_CACHE_SIZE'], app.config['SESSION_CACHE_TTL']),
+            MongoSessionStore(app.db['sessions'], ttl),
+        ))
+    elif backend != 'cookie':
+        raise ValueError(f"Unknown SESSION_BACKEND: {backend}")
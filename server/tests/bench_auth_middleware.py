@@ -0,0 +1,137 @@
+"""Benchmark per-request auth middleware overhead over a realistic request mix.
+
+Builds a minimal app with the same endpoints as the real one, an in-memory
+session store and either the previous middleware (nine `url_for` calls and a
+list scan per request, session loaded for everything) or the current one
+(precompiled endpoint set, static fast lane). Reports the time per request of
+each kind and the number of session loads. Socket.IO events are simulated the
+way Flask-SocketIO runs them with `manage_session=False`, as in app.py: a
+pushed request context on the socket's environ, which loads the session from
+the store on every event in both versions. Run from the server directory:
+
+    python tests/bench_auth_middleware.py
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Blueprint, Flask, jsonify, redirect, request, session, url_for
+from werkzeug.test import EnvironBuilder
+from middleware import auth_middleware
+from session_store import MemoryLRUStore, StoreSessionInterface
+
+REQUESTS = 20000
+# (kind, share of traffic, method, path, logged in)
+MIX = [
+    ('asset', 0.40, 'GET', '/assets/index-3f2a1b.js', True),
+    ('static file', 0.05, 'GET', '/favicon.ico', False),
+    ('socket event', 0.35, None, '/socket.io/', True),
+    ('api', 0.12, 'GET', '/api/user/games', True),
+    ('page', 0.05, 'GET', '/tictactoe', True),
+    ('login', 0.03, 'POST', '/api/auth/login', False),
+]
+
+
+def legacy_middleware(app):
+    """The middleware as it was before the endpoint set and fast lane."""
+    @app.before_request
+    def check_auth():
+        open_paths = [
+            url_for('web_dynamic.register'),
+            url_for('web_dynamic.login'),
+            url_for('web_dynamic.ttt_ai'),
+            url_for('web_dynamic.tictactoe'),
+            url_for('web_dynamic.home'),
+            url_for('web_dynamic.status'),
+            url_for('web_dynamic.modes'),
+            url_for('auth.register'),
+            url_for('auth.login'),
+            ]
+        is_logged_in = 'username' in session
+        current_path = request.path
+        if current_path.startswith('/api/'):
+            if current_path not in open_paths and not is_logged_in:
+                return jsonify({"error": "Unauthenticated"}), 401
+        elif current_path not in open_paths and not is_logged_in and not current_path.startswith('/assets/'):
+            return redirect(url_for('web_dynamic.login', next=request.url))
+
+
+class CountingStore(MemoryLRUStore):
+    loads = 0
+
+    def get(self, sid):
+        self.loads += 1
+        return super().get(sid)
+
+
+def build_app(middleware, static_folder):
+    app = Flask(__name__)
+    app.secret_key = 'bench'
+    store = CountingStore()
+    app.session_interface = StoreSessionInterface(store)
+
+    web = Blueprint('web_dynamic', __name__, static_folder=static_folder)
+    for name in ('login', 'register', 'ttt_ai', 'tictactoe', 'status', 'modes'):
+        web.add_url_rule(f'/{name}', name, lambda: 'ok')
+    web.add_url_rule('/', 'home', lambda: 'ok')
+    web.add_url_rule('/<path:path>', 'serve', lambda path: 'ok')
+    auth = Blueprint('auth', __name__)
+    auth.add_url_rule('/login', 'login', lambda: 'ok', methods=['POST'])
+    auth.add_url_rule('/register', 'register', lambda: 'ok', methods=['POST'])
+    game = Blueprint('game', __name__)
+    game.add_url_rule('/games', 'get_all_games', lambda: 'ok')
+    app.register_blueprint(web)
+    app.register_blueprint(auth, url_prefix='/api/auth')
+    app.register_blueprint(game, url_prefix='/api/user')
+
+    middleware(app)
+    store.set('bench-sid', {'username': 'bench_user'})
+    cookie = StoreSessionInterface(store)._signer(app).sign('bench-sid').decode()
+    return app, store, f'{app.config["SESSION_COOKIE_NAME"]}={cookie}'
+
+
+def run(name, middleware, static_folder, schedule):
+    app, store, cookie = build_app(middleware, static_folder)
+    # Without the cookie jar, which would replace the Cookie header set per request
+    client = app.test_client(use_cookies=False)
+    socket_environ = EnvironBuilder(path='/socket.io/', headers={'Cookie': cookie}).get_environ()
+
+    timings = {kind: [0.0, 0] for kind, *_ in MIX}
+    for kind, method, path, logged_in in schedule:
+        started = time.perf_counter()
+        if method is None:
+            with app.request_context(socket_environ):
+                pass
+        else:
+            client.open(path, method=method, headers={'Cookie': cookie} if logged_in else {})
+        timing = timings[kind]
+        timing[0] += time.perf_counter() - started
+        timing[1] += 1
+
+    total = sum(elapsed for elapsed, _ in timings.values())
+    print(f'{name}: {total / len(schedule) * 1e6:.1f} us/request, {store.loads} session loads')
+    for kind, (elapsed, count) in timings.items():
+        print(f'  {kind:<14} {elapsed / max(count, 1) * 1e6:8.1f} us')
+
+
+def main():
+    rng = random.Random(7)
+    schedule = [
+        (kind, method, path, logged_in)
+        for kind, _, method, path, logged_in in rng.choices(MIX, weights=[share for _, share, *_ in MIX], k=REQUESTS)
+    ]
+    with tempfile.TemporaryDirectory() as static_folder:
+        os.makedirs(os.path.join(static_folder, 'assets'))
+        for name in ('favicon.ico', 'index.html', os.path.join('assets', 'index-3f2a1b.js')):
+            with open(os.path.join(static_folder, name), 'w') as f:
+                f.write('x')
+        run('before', legacy_middleware, static_folder, schedule)
+        run('after', auth_middleware, static_folder, schedule)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,67 @@
+"""Microbenchmark: list-based check_winner vs the Bitboard win-mask lookup.
+
+Run from the server directory:
+
+    python tests/bench_check_winner.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from models.board import Bitboard
+
+
+def legacy_check_winner(board):
+    winning_combinations = [
+        [0, 1, 2], [3, 4, 5], [6, 7, 8],  # Rows
+        [0, 3, 6], [1, 4, 7], [2, 5, 8],  # Columns
+        [0, 4, 8], [2, 4, 6]  # Diagonals
+    ]
+
+    for combo in winning_combinations:
+        if board[combo[0]] == board[combo[1]] == board[combo[2]] != '':
+            return board[combo[0]]
+
+    if '' not in board:
+        return 'draw'
+
+    return None
+
+
+def random_boards(count, seed=42):
+    """Legal positions: play stops at the first win."""
+    rng = random.Random(seed)
+    boards = []
+    for _ in range(count):
+        board = [''] * 9
+        cells = list(range(9))
+        rng.shuffle(cells)
+        for ply, cell in enumerate(cells[:rng.randint(0, 9)]):
+            board[cell] = 'X' if ply % 2 == 0 else 'O'
+            if legacy_check_winner(board):
+                break
+        boards.append(board)
+    return boards
+
+
+def main():
+    boards = random_boards(10_000)
+    bitboards = [Bitboard.from_list(board) for board in boards]
+
+    for board, bitboard in zip(boards, bitboards):
+        assert legacy_check_winner(board) == bitboard.winner(), board
+        assert bitboard.to_list() == board
+
+    runs = 20
+    legacy = min(timeit.repeat(lambda: [legacy_check_winner(b) for b in boards], number=1, repeat=runs))
+    bits = min(timeit.repeat(lambda: [b.winner() for b in bitboards], number=1, repeat=runs))
+    per_call = 1e9 / len(boards)
+    print(f"legacy check_winner: {legacy * per_call:8.1f} ns/call")
+    print(f"Bitboard.winner:     {bits * per_call:8.1f} ns/call  ({legacy / bits:.1f}x faster)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,71 @@
+"""Benchmark concurrent login verification with and without the hashing pool.
+
+Runs CLIENTS green threads that each verify LOGINS passwords, the work done
+by `Auth.valid_login`, while a ticker green thread measures how late the hub
+wakes it up (the delay every socket on the worker would see). Compares:
+
+- inline: `bcrypt.checkpw` in the handler, as before;
+- pool: `PasswordHasher.check` on OS threads, with the login cache off;
+- pool + cache: the same with repeated credentials served from the cache.
+
+Run from the server directory (needs eventlet and bcrypt):
+
+    BCRYPT_ROUNDS=12 python tests/bench_login_throughput.py
+"""
+import eventlet
+eventlet.monkey_patch()
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import bcrypt
+from models.passwords import PasswordHasher
+
+ROUNDS = int(os.getenv('BCRYPT_ROUNDS', 12))
+CLIENTS = int(os.getenv('CLIENTS', 16))
+LOGINS = int(os.getenv('LOGINS', 4))
+PASSWORD = 'correct horse battery staple'
+
+
+def ticker(lags, stop):
+    while not stop:
+        started = time.perf_counter()
+        eventlet.sleep(0.01)
+        lags.append(time.perf_counter() - started - 0.01)
+
+
+def bench(name, check, hashed):
+    lags, stop = [], []
+    tick = eventlet.spawn(ticker, lags, stop)
+    eventlet.sleep(0)
+
+    def client():
+        for _ in range(LOGINS):
+            assert check(PASSWORD, hashed)
+
+    started = time.perf_counter()
+    pool = eventlet.GreenPool(CLIENTS)
+    for _ in range(CLIENTS):
+        pool.spawn(client)
+    pool.waitall()
+    elapsed = time.perf_counter() - started
+    stop.append(True)
+    tick.wait()
+
+    logins = CLIENTS * LOGINS
+    print(f'{name:<14} {logins / elapsed:8.1f} logins/s   max hub lag {max(lags, default=0) * 1000:8.1f} ms')
+
+
+def main():
+    hashed = bcrypt.hashpw(PASSWORD.encode(), bcrypt.gensalt(ROUNDS)).decode()
+    print(f'{CLIENTS} clients x {LOGINS} logins, bcrypt rounds={ROUNDS}')
+    bench('inline', lambda password, stored: bcrypt.checkpw(password.encode(), stored.encode()), hashed)
+    bench('pool', PasswordHasher(ROUNDS, max_pending=CLIENTS, cache_ttl=0).check, hashed)
+    bench('pool + cache', PasswordHasher(ROUNDS, max_pending=CLIENTS).check, hashed)
+
+
+if __name__ == '__main__':
+    main()
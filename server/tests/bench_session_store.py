@@ -0,0 +1,70 @@
+"""Benchmark session lookup latency for each session backend.
+
+Times a session read (the work done for every request and Socket.IO event)
+for the in-memory LRU, a pickle-per-file store equivalent to the filesystem
+backend, and, when MONGO_URI is set, the Mongo store with and without the
+LRU tier. Run from the server directory:
+
+    MONGO_URI=mongodb://localhost:27017 python tests/bench_session_store.py
+"""
+import os
+import pickle
+import secrets
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from session_store import MemoryLRUStore, MongoSessionStore, TieredSessionStore
+
+SESSIONS = 1000
+LOOKUPS = 20000
+
+
+class FileStore:
+    """One pickle file per session, like Flask-Session's filesystem backend."""
+
+    def __init__(self, directory):
+        self.directory = directory
+
+    def get(self, sid):
+        try:
+            with open(os.path.join(self.directory, sid), 'rb') as f:
+                return pickle.load(f)
+        except FileNotFoundError:
+            return None
+
+    def set(self, sid, data, ttl=None):
+        with open(os.path.join(self.directory, sid), 'wb') as f:
+            pickle.dump(data, f)
+
+
+def bench(name, store):
+    sids = [secrets.token_urlsafe(32) for _ in range(SESSIONS)]
+    for index, sid in enumerate(sids):
+        store.set(sid, {'username': f'user_{index}'})
+    lookups = LOOKUPS if not isinstance(store, MongoSessionStore) else LOOKUPS // 10
+    started = time.perf_counter()
+    for index in range(lookups):
+        store.get(sids[index % SESSIONS])
+    elapsed = time.perf_counter() - started
+    print(f'{name:<24} {elapsed / lookups * 1e6:10.2f} us/lookup')
+
+
+def main():
+    bench('memory LRU', MemoryLRUStore())
+    with tempfile.TemporaryDirectory() as directory:
+        bench('filesystem (pickle)', FileStore(directory))
+
+    if os.getenv('MONGO_URI'):
+        from pymongo import MongoClient
+        collection = MongoClient(os.environ['MONGO_URI'])['tic_tac_toe_bench']['sessions']
+        collection.delete_many({})
+        bench('mongodb', MongoSessionStore(collection))
+        bench('mongodb + LRU tier', TieredSessionStore(MemoryLRUStore(ttl=60), MongoSessionStore(collection)))
+        collection.drop()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,96 @@
+"""Benchmark static client serving: send_from_directory versus the asset index.
+
+Creates a Vite-like build (index.html plus hashed JS/CSS bundles), then
+measures requests/sec through the Flask test client for the previous
+catch-all (`os.path.exists` + `send_from_directory` per request) and for
+`AssetIndex`. For the index it also measures gzip-negotiated bundles and
+revalidation with If-None-Match (304). Run from the server directory:
+
+    python tests/bench_static_assets.py
+"""
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from flask import Flask, send_from_directory
+from web_dynamic.assets import AssetIndex
+
+REQUESTS = 5000
+BUILD = {
+    'index.html': '<!doctype html><html><head><script type="module" src="/assets/index-3f2a1b9c.js"></script></head><body><div id="root"></div></body></html>\n' * 4,
+    'assets/index-3f2a1b9c.js': 'export const board = [' + ','.join(f'"cell{i}"' for i in range(20000)) + '];\n',
+    'assets/index-8d7e6f5a.css': '.cell{display:flex;align-items:center;justify-content:center}\n' * 800,
+    'favicon.ico': 'x' * 4096,
+}
+# (label, path, Accept-Encoding)
+CASES = [
+    ('SPA route', '/tictactoe', ''),
+    ('bundle', '/assets/index-3f2a1b9c.js', ''),
+    ('bundle (gzip)', '/assets/index-3f2a1b9c.js', 'gzip, deflate, br'),
+]
+
+
+def legacy_app(static_folder):
+    app = Flask(__name__)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        if path != "" and os.path.exists(static_folder + '/' + path):
+            return send_from_directory(static_folder, path)
+        return send_from_directory(static_folder, 'index.html')
+    return app
+
+
+def index_app(static_folder):
+    app = Flask(__name__)
+    assets = AssetIndex(static_folder)
+
+    @app.route('/', defaults={'path': ''})
+    @app.route('/<path:path>')
+    def serve(path):
+        asset = assets.get(path) if path else None
+        return assets.response(asset or assets.get('index.html'))
+    return app, assets
+
+
+def bench(client, path, headers):
+    client.get(path, headers=headers)
+    started = time.perf_counter()
+    for _ in range(REQUESTS):
+        response = client.get(path, headers=headers)
+        response.get_data()
+    return REQUESTS / (time.perf_counter() - started), response
+
+
+def main():
+    with tempfile.TemporaryDirectory() as static_folder:
+        for path, content in BUILD.items():
+            os.makedirs(os.path.dirname(os.path.join(static_folder, path)), exist_ok=True)
+            with open(os.path.join(static_folder, path), 'w') as f:
+                f.write(content)
+
+        legacy = legacy_app(static_folder).test_client()
+        app, assets = index_app(static_folder)
+        client = app.test_client()
+
+        print(f'{"case":<22} {"before":>12} {"after":>12}  after: bytes, encoding')
+        for label, path, accept in CASES:
+            headers = {'Accept-Encoding': accept} if accept else {}
+            before, _ = bench(legacy, path, headers)
+            after, response = bench(client, path, headers)
+            print(f'{label:<22} {before:10.0f}/s {after:10.0f}/s  '
+                  f'{len(response.get_data())}, {response.headers.get("Content-Encoding", "identity")}')
+
+        bundle = assets.get('assets/index-3f2a1b9c.js')
+        etag = client.get('/assets/index-3f2a1b9c.js').headers['ETag']
+        revalidated, response = bench(client, '/assets/index-3f2a1b9c.js', {'If-None-Match': etag})
+        print(f'{"revalidate (304)":<22} {"":>12} {revalidated:10.0f}/s  status {response.status_code}')
+        print(f'bundle Cache-Control: {bundle.cache_control}')
+
+
+if __name__ == '__main__':
+    main()
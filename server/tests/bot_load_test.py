@@ -0,0 +1,88 @@
+"""Bot-only load test of the full multiplayer pipeline.
+
+Each scripted client logs in, calls join_game and waits; with nobody else
+queued the server backfills its seat with a bot after BOT_BACKFILL_SECONDS,
+and the client then plays random legal moves until the game ends. Reports
+time-to-first-move and completed games per second. Start the server with a
+short backfill, e.g. BOT_BACKFILL_SECONDS=1 BOT_MOVE_DELAY=0, then run from
+the server directory:
+
+    python tests/bot_load_test.py http://localhost:3000 --clients 50
+"""
+import argparse
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import socketio
+
+from load_test_workers import session_cookie
+
+
+def play(url, cookie, results):
+    client = socketio.Client(reconnection=False)
+    board = [''] * 9
+    state = {'joined_at': None, 'game_id': None}
+    done = threading.Event()
+
+    def move():
+        empty = [cell for cell, value in enumerate(board) if value == '']
+        if empty:
+            position = random.choice(empty)
+            board[position] = 'X'
+            client.emit('make_move', {'game_id': state['game_id'], 'position': position})
+
+    @client.on('game_joined')
+    def on_game_joined(data):
+        state['game_id'] = data['game_id']
+
+    @client.on('opponent_joined')
+    def on_opponent_joined(data):
+        results['time_to_first_move'].append(time.perf_counter() - state['joined_at'])
+        move()
+
+    @client.on('move_made')
+    def on_move_made(data):
+        board[data['position']] = 'O'
+        move()
+
+    @client.on('game_over')
+    def on_game_over(data):
+        results['games'].append(data['result'])
+        done.set()
+
+    @client.on('error')
+    def on_error(data):
+        results['errors'].append(data['message'])
+        done.set()
+
+    client.connect(url, headers={'Cookie': cookie}, transports=['websocket'])
+    state['joined_at'] = time.perf_counter()
+    client.emit('join_game')
+    done.wait(timeout=120)
+    client.disconnect()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('url')
+    parser.add_argument('--clients', type=int, default=20)
+    args = parser.parse_args()
+
+    cookies = [session_cookie(args.url, index) for index in range(args.clients)]
+    results = {'time_to_first_move': [], 'games': [], 'errors': []}
+    started = time.perf_counter()
+    with ThreadPoolExecutor(args.clients) as pool:
+        list(pool.map(lambda cookie: play(args.url, cookie, results), cookies))
+    elapsed = time.perf_counter() - started
+
+    waits = sorted(results['time_to_first_move']) or [0.0]
+    print(f"{len(results['games'])} games in {elapsed:.2f}s ({len(results['games']) / elapsed:.1f} games/s)")
+    print(f"time to first move: p50 {waits[len(waits) // 2]:.2f}s, max {waits[-1]:.2f}s")
+    if results['errors']:
+        print(f"{len(results['errors'])} errors, e.g. {results['errors'][0]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,11 @@
+"""Pytest setup for the unit tests in this directory.
+
+The other scripts here (benchmarks, load tests, `test_api.py`) run against a
+live server and are started by hand, not collected.
+"""
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+collect_ignore = ['test_api.py', 'bot_load_test.py']
@@ -0,0 +1,76 @@
+"""Connection scaling load test across Socket.IO workers.
+
+Registers/logs in throwaway users over HTTP, then opens Socket.IO
+connections spread round-robin over the first 1..N workers and reports the
+connection rate for each worker count. Near-linear scaling means the rate
+grows roughly with the number of workers. Run from the server directory
+against workers started with the same SOCKETIO_MESSAGE_QUEUE and distinct
+WORKER_IDs:
+
+    python tests/load_test_workers.py http://localhost:3001 http://localhost:3002 --clients 400
+
+HTTP calls use the standard library. The Socket.IO client needs the
+client extras of python-socketio (`pip install "python-socketio[client]"`),
+like the other socket scripts here.
+"""
+import argparse
+import json
+import time
+import urllib.error
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import CookieJar
+
+import socketio
+
+
+def post_json(opener, url, payload):
+    request = urllib.request.Request(
+        url, data=json.dumps(payload).encode(), headers={'Content-Type': 'application/json'}, method='POST')
+    with opener.open(request) as response:
+        return response.status
+
+
+def session_cookie(base_url, index):
+    username = f'loadtest_{index}'
+    password = 'loadtest-password'
+    jar = CookieJar()
+    http = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    try:
+        post_json(http, f'{base_url}/api/auth/register', {
+            'username': username,
+            'email': f'{username}@example.com',
+            'password': password,
+        })
+    except urllib.error.HTTPError:
+        pass  # Already registered by an earlier run
+    post_json(http, f'{base_url}/api/auth/login', {'username': username, 'password': password})
+    return '; '.join(f'{cookie.name}={cookie.value}' for cookie in jar)
+
+
+def connect(url, cookie):
+    client = socketio.Client(reconnection=False)
+    client.connect(url, headers={'Cookie': cookie}, transports=['websocket'])
+    return client
+
+
+def run(workers, clients, concurrency):
+    cookies = [session_cookie(workers[0], index) for index in range(clients)]
+    for count in range(1, len(workers) + 1):
+        targets = [workers[index % count] for index in range(clients)]
+        started = time.perf_counter()
+        with ThreadPoolExecutor(concurrency) as pool:
+            connected = list(pool.map(connect, targets, cookies))
+        elapsed = time.perf_counter() - started
+        print(f'{count} worker(s): {clients} connections in {elapsed:.2f}s ({clients / elapsed:.0f}/s)')
+        for client in connected:
+            client.disconnect()
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('workers', nargs='+', help='Base URL of each worker')
+    parser.add_argument('--clients', type=int, default=200)
+    parser.add_argument('--concurrency', type=int, default=50)
+    args = parser.parse_args()
+    run(args.workers, args.clients, args.concurrency)
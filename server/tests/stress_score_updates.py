@@ -0,0 +1,73 @@
+"""Concurrency stress test for the pipeline score updates.
+
+Hammers one throwaway user with concurrent wins, losses and draws through
+`User` and `Settlement`, then checks that no update was lost and the score
+never went negative. Needs a running MongoDB; run from the server directory:
+
+    MONGO_URI=mongodb://localhost:27017 python tests/stress_score_updates.py
+"""
+import os
+import random
+import sys
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from pymongo import MongoClient
+from models.leaderboard import Leaderboard
+from models.settlement import Settlement
+from models.user import User
+
+THREADS = 32
+OPERATIONS = 2000
+USERNAME = 'stress_score_user'
+
+
+def main():
+    client = MongoClient(os.getenv('MONGO_URI', 'mongodb://localhost:27017'))
+    db = client[os.getenv('MONGO_DATABASE', 'tic_tac_toe_stress')]
+    users = User(db)
+    leaderboard = Leaderboard(db)
+    settlement = Settlement(db, leaderboard)
+
+    db['users'].delete_many({'username': {'$in': [USERNAME, 'stress_opponent']}})
+    db['users'].insert_many([
+        {'username': name, 'wins': 0, 'losses': 0, 'draws': 0, 'game_played': 0, 'score': 0}
+        for name in (USERNAME, 'stress_opponent')
+    ])
+
+    rng = random.Random(7)
+    operations = [rng.choice(['win', 'loss', 'draw', 'settle_win', 'settle_loss']) for _ in range(OPERATIONS)]
+
+    def run(operation):
+        if operation == 'win':
+            users.increment_wins(USERNAME)
+        elif operation == 'loss':
+            users.increment_losses(USERNAME)
+        elif operation == 'draw':
+            users.increment_draws(USERNAME)
+        elif operation == 'settle_win':
+            settlement.settle_win(USERNAME, 'stress_opponent')
+        else:
+            settlement.settle_win('stress_opponent', USERNAME)
+
+    with ThreadPoolExecutor(THREADS) as pool:
+        list(pool.map(run, operations))
+
+    user = db['users'].find_one({'username': USERNAME})
+    wins = operations.count('win') + operations.count('settle_win')
+    losses = operations.count('loss') + operations.count('settle_loss')
+    draws = operations.count('draw')
+    expected = {'wins': wins, 'losses': losses, 'draws': draws, 'game_played': wins + losses + draws}
+
+    actual = {field: user[field] for field in expected}
+    assert actual == expected, f'lost updates: expected {expected}, got {actual}'
+    assert user['score'] >= 0, f'negative score: {user["score"]}'
+    assert user['score'] <= wins * 3 + draws, f'score above maximum: {user["score"]}'
+    print(f'{OPERATIONS} concurrent updates, no lost updates, final score {user["score"]}')
+
+    db['users'].delete_many({'username': {'$in': [USERNAME, 'stress_opponent']}})
+
+
+if __name__ == '__main__':
+    main()
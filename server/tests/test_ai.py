@@ -0,0 +1,52 @@
+import random
+import pytest
+from models.ai import AIEngine, bot_player
+from models.board import Bitboard
+
+
+@pytest.fixture(scope='module')
+def ai():
+    return AIEngine()
+
+
+def test_every_legal_position_is_reached(ai):
+    # 5,478 legal positions, of which the 4,520 not yet decided are stored
+    assert ai.positions == 5478
+    assert len(ai.table) == 4520
+
+
+def test_empty_board_is_a_draw_with_every_move(ai):
+    scores = ai.evaluate(Bitboard())
+    assert sorted(scores) == list(range(9))
+    assert set(scores.values()) == {0}
+
+
+def test_takes_the_win_and_blocks_the_loss(ai):
+    # X to move wins at 2
+    assert ai.best_moves(Bitboard.from_list(['X', 'X', '', 'O', 'O', '', '', '', ''])) == (2,)
+    # O to move must block at 2
+    assert ai.best_moves(Bitboard.from_list(['X', 'X', '', '', 'O', '', '', '', ''])) == (2,)
+
+
+def test_finished_games_have_no_moves(ai):
+    board = Bitboard.from_list(['X', 'X', 'X', 'O', 'O', '', '', '', ''])
+    assert ai.best_moves(board) == ()
+    assert ai.best_move(board) is None
+
+
+def test_hard_bot_never_loses(ai):
+    rng = random.Random(1)
+    for _ in range(200):
+        board = Bitboard()
+        symbol = 'X'
+        while board.winner() is None:
+            difficulty = 'easy' if symbol == 'X' else 'hard'
+            board.place(ai.choose_move(board, difficulty, rng), symbol)
+            symbol = 'O' if symbol == 'X' else 'X'
+        assert board.winner() in ('O', 'draw')
+
+
+def test_unknown_difficulty_is_rejected():
+    assert bot_player('medium') == 'bot:medium'
+    with pytest.raises(ValueError):
+        bot_player('impossible')
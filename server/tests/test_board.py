@@ -0,0 +1,84 @@
+import pytest
+from models.board import Bitboard, GridBoard, WINNING, WIN_MASKS, board_from_moves, board_from_storage
+
+
+def test_bitboard_round_trips_and_judges_the_classic_board():
+    cells = ['X', 'O', '', '', 'X', 'O', '', '', 'X']
+    board = Bitboard.from_list(cells)
+    assert board.to_list() == cells
+    assert board.winner() == 'X'
+    assert Bitboard.from_list(['X', 'O', 'X', 'X', 'O', 'O', 'O', 'X', 'X']).winner() == 'draw'
+    assert Bitboard().winner() is None
+
+
+def test_win_table_matches_the_masks():
+    for bits in range(512):
+        assert bool(WINNING[bits]) == any(bits & mask == mask for mask in WIN_MASKS)
+
+
+def test_bitboard_rejects_taken_cells_and_bad_boards():
+    board = Bitboard()
+    board.place(4, 'O')
+    assert board[4] == 'O'
+    with pytest.raises(ValueError):
+        board.place(4, 'X')
+    with pytest.raises(ValueError):
+        board.is_empty(9)
+    with pytest.raises(ValueError):
+        Bitboard.from_list([''] * 8)
+
+
+def play(board, cells, symbol):
+    for cell in cells:
+        board.place(cell, symbol)
+    return board.winner()
+
+
+@pytest.mark.parametrize('cells', [
+    [0, 1, 2, 3],  # Top row, from the left edge
+    [12, 13, 14, 15],  # Bottom row
+    [3, 7, 11, 15],  # Right column
+    [0, 5, 10, 15],  # Diagonal, corner to corner
+    [3, 6, 9, 12],  # Anti-diagonal
+    [15, 10, 5, 0],  # Completed at the top-left corner
+])
+def test_four_in_a_row_on_the_edges(cells):
+    assert play(GridBoard(4, 4), cells, 'X') == 'X'
+
+
+def test_lines_do_not_wrap_around_the_edge():
+    board = GridBoard(4, 4)
+    # 2, 3 end the first row and 4, 5 start the second: adjacent indexes, not a line
+    assert play(board, [2, 3, 4, 5], 'O') is None
+
+
+def test_k_in_a_row_on_a_large_board():
+    board = GridBoard(15, 5)
+    assert play(board, [14, 28, 42, 56], 'X') is None  # Anti-diagonal from the top-right corner
+    assert play(board, [70], 'X') == 'X'
+    board = GridBoard(15, 5)
+    assert play(board, [220, 221, 222, 224], 'O') is None  # Gap at 223
+    assert play(board, [223], 'O') == 'O'
+
+
+def test_full_grid_without_a_line_is_a_draw():
+    moves = [0, 1, 2, 3, 5, 4, 6, 7, 9, 8, 10, 11, 12, 13, 15, 14]
+    board = board_from_moves('connect4x4', [{'c': cell, 'p': ply} for ply, cell in enumerate(moves)])
+    assert board.winner() == 'draw'
+
+
+def test_taken_and_out_of_range_cells_are_rejected():
+    board = GridBoard(4, 4)
+    board.place(0, 'X')
+    with pytest.raises(ValueError):
+        board.place(0, 'O')
+    with pytest.raises(ValueError):
+        board.place(16, 'O')
+
+
+def test_grid_board_storage_round_trips():
+    board = board_from_moves('gomoku', [{'c': 0, 'p': 0}, {'c': 224, 'p': 1}])
+    restored = board_from_storage('gomoku', board.to_storage())
+    assert restored.to_list() == board.to_list()
+    assert restored[0] == 'X' and restored[224] == 'O'
+    assert board_from_storage('gomoku', board.to_list()).to_list() == board.to_list()
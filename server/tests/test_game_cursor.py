@@ -0,0 +1,21 @@
+from datetime import datetime
+import pytest
+
+pytest.importorskip('bson')
+pytest.importorskip('pymongo')
+from bson import ObjectId
+from models.game import Game
+
+
+def test_cursor_round_trips():
+    created_at = datetime(2024, 5, 1, 12, 30, 15, 123000)
+    game_id = ObjectId('65f000000000000000000001')
+    cursor = Game.encode_cursor(created_at, game_id)
+    assert '=' not in cursor
+    assert Game.decode_cursor(cursor) == (created_at, game_id)
+
+
+@pytest.mark.parametrize('cursor', ['', 'not-base64!', 'bm8tc2VwYXJhdG9y', 'MjAyNC0wNS0wMXxub3QtYW4taWQ'])
+def test_malformed_cursor_is_a_value_error(cursor):
+    with pytest.raises(ValueError):
+        Game.decode_cursor(cursor)
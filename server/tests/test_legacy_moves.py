@@ -0,0 +1,30 @@
+from datetime import datetime
+import pytest
+
+pytest.importorskip('pymongo')
+pytest.importorskip('click')
+from database import legacy_moves
+from models.board import board_from_moves
+
+PLAYED_AT = datetime(2023, 1, 1)
+
+
+def test_interleaves_x_and_o_in_cell_order():
+    board = ['O', 'X', '', 'X', 'O', '', 'X', '', '']
+    moves = legacy_moves(board, PLAYED_AT)
+    assert [(move['p'], move['c']) for move in moves] == [(0, 1), (1, 0), (2, 3), (3, 4), (4, 6)]
+    assert all(move['t'] == PLAYED_AT for move in moves)
+    # Replaying the log gives back the stored board
+    assert board_from_moves('classic', moves).to_list() == board
+
+
+def test_empty_board_has_no_moves():
+    assert legacy_moves([''] * 9, PLAYED_AT) == []
+
+
+@pytest.mark.parametrize('board', [
+    ['O', '', '', '', '', '', '', '', ''],  # O moved first
+    ['X', 'X', '', '', '', '', '', '', ''],  # X moved twice
+])
+def test_unreachable_boards_are_skipped(board):
+    assert legacy_moves(board, PLAYED_AT) is None
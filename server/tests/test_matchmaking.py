@@ -0,0 +1,110 @@
+import types
+import pytest
+
+# Importing the package starts the Socket.IO layer
+pytest.importorskip('flask_socketio')
+from multiplayer_socketIO import matchmaking
+from multiplayer_socketIO.matchmaking import Matchmaker, MatchmakerPool, SkillMatchmaker
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Manual clock for ticket wait times: `clock.now += seconds`."""
+    clock = types.SimpleNamespace(now=1000.0)
+    monkeypatch.setattr(matchmaking, 'time', types.SimpleNamespace(monotonic=lambda: clock.now))
+    return clock
+
+
+def test_fifo_pops_oldest_and_skips_the_callers_ticket(clock):
+    queue = Matchmaker()
+    queue.enqueue('ann', 'g1')
+    queue.enqueue('bob', 'g2')
+    assert queue.pop('ann').player_id == 'bob'
+    assert queue.pop('ann') is None
+    # The caller's own ticket kept its place at the head
+    queue.enqueue('cat', 'g3')
+    assert queue.pop('dan').player_id == 'ann'
+
+
+def test_remove_only_drops_the_ticket_of_the_given_game(clock):
+    queue = Matchmaker()
+    queue.enqueue('ann', 'g1')
+    assert queue.remove('ann', 'g0') is None
+    assert queue.remove('ann', 'g1').game_id == 'g1'
+    assert len(queue) == 0
+
+
+def test_stats_report_waits_of_paired_and_queued_players(clock):
+    queue = Matchmaker()
+    queue.enqueue('ann', 'g1')
+    clock.now += 4
+    queue.enqueue('bob', 'g2')
+    clock.now += 2
+    assert queue.pop('cat').player_id == 'ann'
+    stats = queue.stats()
+    assert stats['queue_depth'] == 1
+    assert stats['matched'] == 1
+    assert stats['max_wait_seconds'] == stats['avg_wait_seconds'] == 6
+    assert stats['oldest_wait_seconds'] == 2
+
+
+def test_pool_records_the_wait_of_paired_players(clock, monkeypatch):
+    observed = []
+    monkeypatch.setattr(matchmaking, 'MATCHMAKING_WAIT', types.SimpleNamespace(observe=lambda *args: observed.append(args)))
+    pool = MatchmakerPool(Matchmaker)
+    pool.enqueue('ann', 'g1', variant='gomoku')
+    clock.now += 7
+    assert pool.pop('bob', variant='gomoku').player_id == 'ann'
+    assert pool.pop('bob') is None
+    assert observed == [(7, 'gomoku')]
+
+
+def test_skill_window_widens_with_waiting_time(clock):
+    queue = SkillMatchmaker(bucket_width=10, widen_seconds=5, max_wait=30)
+    queue.enqueue('ann', 'g1', score=100)
+    # Three buckets away: out of reach until ann has waited 15 seconds
+    assert queue.pop('bob', score=130) is None
+    clock.now += 14
+    assert queue.pop('bob', score=130) is None
+    clock.now += 1
+    assert queue.pop('bob', score=130).player_id == 'ann'
+
+
+def test_skill_accepts_anyone_after_max_wait(clock):
+    queue = SkillMatchmaker(bucket_width=10, widen_seconds=5, max_wait=30)
+    queue.enqueue('ann', 'g1', score=0)
+    clock.now += 29
+    assert queue.pop('bob', score=5000) is None
+    clock.now += 1
+    assert queue.pop('bob', score=5000).player_id == 'ann'
+    assert queue.accepts(0, 30, 5000)
+    assert not queue.accepts(0, 29, 5000)
+
+
+def test_skill_prefers_the_nearest_bucket(clock):
+    queue = SkillMatchmaker(bucket_width=10, widen_seconds=5, max_wait=30)
+    queue.enqueue('far', 'g1', score=60)
+    queue.enqueue('near', 'g2', score=110)
+    clock.now += 25
+    assert queue.pop('bob', score=100).player_id == 'near'
+    assert queue.pop('bob', score=100).player_id == 'far'
+
+
+def test_skill_never_pairs_a_player_with_themselves(clock):
+    queue = SkillMatchmaker()
+    queue.enqueue('ann', 'g1', score=50)
+    clock.now += 60
+    assert queue.pop('ann', score=50) is None
+    assert len(queue) == 1
+
+
+def test_pool_keeps_variants_apart(clock):
+    pool = MatchmakerPool(Matchmaker)
+    pool.enqueue('ann', 'g1', variant='gomoku')
+    assert pool.pop('bob') is None
+    assert pool.pop('bob', variant='gomoku').player_id == 'ann'
+    # Queueing for another variant moves the ticket
+    pool.enqueue('cat', 'g2', variant='gomoku')
+    pool.enqueue('cat', 'g3')
+    assert pool.pop('bob', variant='gomoku') is None
+    assert pool.remove('cat').game_id == 'g3'
@@ -0,0 +1,50 @@
+from models.ranking import ScoreRanking
+
+
+def entry(username, score, wins=0, draws=0):
+    return {'username': username, 'score': score, 'wins': wins, 'draws': draws}
+
+
+def test_tied_scores_share_a_rank():
+    ranking = ScoreRanking()
+    ranking.load([entry('ann', 30), entry('bob', 20), entry('cat', 20), entry('dan', 10)])
+    assert [ranking.rank(name) for name in ('ann', 'bob', 'cat', 'dan')] == [1, 2, 2, 4]
+
+
+def test_update_moves_a_player_and_the_players_they_pass():
+    ranking = ScoreRanking()
+    ranking.load([entry('ann', 30), entry('bob', 20), entry('cat', 10)])
+    ranking.increment('cat', wins=1, score=25)
+    assert ranking.get('cat') == entry('cat', 35, wins=1)
+    assert [ranking.rank(name) for name in ('cat', 'ann', 'bob')] == [1, 2, 3]
+    ranking.set(entry('ann', 35))
+    assert ranking.rank('ann') == ranking.rank('cat') == 1
+    assert ranking.rank('bob') == 3
+
+
+def test_scores_beyond_the_tree_size_grow_it():
+    ranking = ScoreRanking()
+    ranking.load([entry('ann', 5), entry('bob', 1000)])
+    ranking.set(entry('cat', 70000))
+    assert [ranking.rank(name) for name in ('cat', 'bob', 'ann')] == [1, 2, 3]
+
+
+def test_remove_and_unknown_players():
+    ranking = ScoreRanking()
+    ranking.load([entry('ann', 30), entry('bob', 20)])
+    ranking.remove('ann')
+    ranking.remove('nobody')
+    assert ranking.rank('ann') is None
+    assert ranking.rank('bob') == 1
+    assert len(ranking) == 1
+
+
+def test_top_orders_ties_by_username_and_refreshes_its_cache():
+    ranking = ScoreRanking(top_size=2)
+    ranking.load([entry('cat', 20), entry('bob', 20), entry('ann', 10)])
+    assert [player['username'] for player in ranking.top(2)] == ['bob', 'cat']
+    payload = ranking.top_payload()
+    ranking.set(entry('ann', 50))
+    assert [player['username'] for player in ranking.top(2)] == ['ann', 'bob']
+    assert ranking.top_payload() != payload
+    assert [player['username'] for player in ranking.top(3)] == ['ann', 'bob', 'cat']
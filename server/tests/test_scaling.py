@@ -0,0 +1,64 @@
+import pytest
+
+# Importing the package starts the Socket.IO layer
+pytest.importorskip('flask_socketio')
+from bson import ObjectId
+from multiplayer_socketIO.scaling import GameRouter, LocalBroker, shard_of
+
+WORKERS = ['w1', 'w2', 'w3']
+
+
+def test_minted_ids_hash_to_their_creator():
+    router = GameRouter(LocalBroker(), 'w2', WORKERS)
+    for _ in range(20):
+        game_id = router.new_game_id()
+        assert shard_of(game_id, WORKERS) == 'w2'
+        assert router.owner_of(game_id) is None
+
+
+def test_shards_are_spread_over_the_workers():
+    counts = {worker: 0 for worker in WORKERS}
+    for _ in range(3000):
+        counts[shard_of(ObjectId(), WORKERS)] += 1
+    assert min(counts.values()) > 800
+
+
+def test_unknown_worker_is_rejected():
+    with pytest.raises(ValueError):
+        GameRouter(LocalBroker(), 'w9', WORKERS)
+
+
+class RecordingBroker:
+    """Keeps what is published; `listen` replays one channel and stops."""
+
+    def __init__(self):
+        self.published = []
+
+    def publish(self, channel, message):
+        self.published.append((channel, message))
+
+    def listen(self, channel):
+        return iter([message for published, message in self.published if published == channel])
+
+
+def test_moves_joins_and_disconnects_reach_the_owners_handlers():
+    broker = RecordingBroker()
+    owner = GameRouter(broker, 'w1', WORKERS)
+    sender = GameRouter(broker, 'w2', WORKERS)
+    game_id = owner.new_game_id()
+    assert sender.owner_of(game_id) == 'w1'
+
+    sender.forward_move('w1', game_id, 'ann', 4, 'sid1')
+    sender.forward_join('w1', game_id, 'bob', 'sid2')
+    sender.forward_disconnect('w1', game_id, 'ann', 'sid1')
+    calls = []
+
+    def handler(kind):
+        return lambda **fields: calls.append((kind, fields))
+
+    owner.listen({kind: handler(kind) for kind in ('move', 'join', 'disconnect')})
+    assert calls == [
+        ('move', {'game_id': str(game_id), 'player_id': 'ann', 'position': 4, 'sid': 'sid1'}),
+        ('join', {'game_id': str(game_id), 'player_id': 'bob', 'sid': 'sid2'}),
+        ('disconnect', {'game_id': str(game_id), 'player_id': 'ann', 'sid': 'sid1'}),
+    ]
@@ -1 +1 @@
-from .template_renderer import web_bp
+from .template_renderer import web_bp, init_assets
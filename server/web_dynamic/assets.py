@@ -0,0 +1,145 @@
+"""In-memory index of the built web client, served with compression and ETags."""
+import gzip
+import hashlib
+import mimetypes
+import os
+import re
+from flask import Response, request, send_file
+
+try:
+    import brotli
+except ImportError:  # Optional: without it only gzip variants are built
+    brotli = None
+
+# Vite bundles carry a content hash in their name (assets/index-3f2a1b9c.js),
+# so a given URL never changes and can be cached forever.
+HASHED_ASSET = re.compile(r'(^|/)assets/.+[-.][A-Za-z0-9_-]{8,}\.[A-Za-z0-9]+$')
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+
+COMPRESSIBLE_TYPES = ('text/', 'application/javascript', 'application/json', 'image/svg+xml', 'application/wasm')
+COMPRESS_MIN_SIZE = 1024
+
+# Content-Encoding -> (file suffix of a prebuilt variant, compressor)
+ENCODINGS = {
+    'br': ('.br', (lambda data: brotli.compress(data, quality=11)) if brotli else None),
+    'gzip': ('.gz', lambda data: gzip.compress(data, compresslevel=9, mtime=0)),
+}
+
+
+class Asset:
+    """One static file: its identity, cache policy and encoded bodies."""
+
+    __slots__ = ('path', 'file', 'mimetype', 'etag', 'cache_control', 'bodies', 'files')
+
+    def __init__(self, path, file, mimetype, etag, cache_control):
+        self.path = path
+        self.file = file
+        self.mimetype = mimetype
+        self.etag = etag
+        self.cache_control = cache_control
+        # encoding ('identity', 'gzip', 'br') -> bytes held in memory
+        self.bodies = {}
+        # encoding -> file on disk, for prebuilt variants too large to hold
+        self.files = {}
+
+    @property
+    def encodings(self):
+        return set(self.bodies) | set(self.files)
+
+
+class AssetIndex:
+    """Every file of the static folder, indexed once at startup.
+
+    Files up to `max_memory_size` bytes are held in memory. Compressible ones
+    also get gzip (and, if the `brotli` package is installed, brotli)
+    variants, built once here. Prebuilt `.gz`/`.br` files next to an asset
+    are used instead when present. Each asset has a strong ETag from its
+    content hash. Hashed bundles are sent as immutable and everything else,
+    notably `index.html`, must be revalidated.
+    """
+
+    def __init__(self, static_folder, max_memory_size=512 * 1024):
+        self.static_folder = static_folder
+        self.max_memory_size = max_memory_size
+        self.assets = {}
+        if static_folder and os.path.isdir(static_folder):
+            self._scan()
+
+    def __len__(self):
+        return len(self.assets)
+
+    def get(self, path):
+        return self.assets.get(path.lstrip('/'))
+
+    def _scan(self):
+        suffixes = tuple(suffix for suffix, _ in ENCODINGS.values())
+        for root, _, names in os.walk(self.static_folder):
+            for name in names:
+                file = os.path.join(root, name)
+                path = os.path.relpath(file, self.static_folder).replace(os.sep, '/')
+                if path.endswith(suffixes) and os.path.exists(file[:-3]):
+                    continue  # A prebuilt variant, attached to its asset below
+                self.assets[path] = self._load(path, file)
+
+    def _load(self, path, file):
+        mimetype = mimetypes.guess_type(path)[0] or 'application/octet-stream'
+        digest = hashlib.sha256()
+        with open(file, 'rb') as f:
+            for chunk in iter(lambda: f.read(1 << 16), b''):
+                digest.update(chunk)
+        cache_control = IMMUTABLE if HASHED_ASSET.search(path) else REVALIDATE
+        asset = Asset(path, file, mimetype, digest.hexdigest()[:32], cache_control)
+
+        size = os.path.getsize(file)
+        in_memory = size <= self.max_memory_size
+        if in_memory:
+            with open(file, 'rb') as f:
+                asset.bodies['identity'] = f.read()
+
+        compressible = size >= COMPRESS_MIN_SIZE and mimetype.startswith(COMPRESSIBLE_TYPES)
+        for encoding, (suffix, compress) in ENCODINGS.items():
+            if os.path.exists(file + suffix):
+                if in_memory:
+                    with open(file + suffix, 'rb') as f:
+                        asset.bodies[encoding] = f.read()
+                else:
+                    asset.files[encoding] = file + suffix
+            elif in_memory and compressible and compress:
+                body = compress(asset.bodies['identity'])
+                if len(body) < size:
+                    asset.bodies[encoding] = body
+        return asset
+
+    @staticmethod
+    def _negotiate(asset):
+        accepted = request.accept_encodings
+        for encoding in ('br', 'gzip'):
+            if encoding in asset.encodings and accepted[encoding] > 0:
+                return encoding
+        return 'identity'
+
+    def response(self, asset):
+        """Response for `asset`, negotiated on Accept-Encoding and If-None-Match."""
+        encoding = self._negotiate(asset)
+        # Strong ETags must differ between byte-different representations
+        etag = asset.etag if encoding == 'identity' else f'{asset.etag}-{encoding}'
+        headers = {'Cache-Control': asset.cache_control}
+        if asset.encodings - {'identity'}:
+            headers['Vary'] = 'Accept-Encoding'
+
+        if request.if_none_match.contains(etag):
+            response = Response(status=304, headers=headers)
+            response.set_etag(etag)
+            return response
+
+        body = asset.bodies.get(encoding)
+        if body is not None:
+            response = Response(body, mimetype=asset.mimetype, headers=headers)
+        else:
+            response = send_file(asset.files.get(encoding, asset.file), mimetype=asset.mimetype, conditional=False)
+            response.headers.update(headers)
+        if encoding != 'identity':
+            response.headers['Content-Encoding'] = encoding
+        response.set_etag(etag)
+        return response
@@ -1,52 +1,96 @@
-from flask import Blueprint, send_from_directory, redirect, url_for, session, jsonify
-import os
+import hmac
+from flask import Blueprint, Response, abort, current_app, redirect, request, url_for, session, jsonify
+import health
+from metrics import METRICS
+from .assets import AssetIndex
 
 web_bp = Blueprint('web_dynamic', __name__, static_folder='../static')
 
+# Built client, indexed once by `init_assets`
+ASSETS = AssetIndex(None)
+
+
+def send_asset(path):
+    asset = ASSETS.get(path)
+    if asset is None:
+        abort(404)
+    return ASSETS.response(asset)
+
 
 @web_bp.route('/login')
 def login():
     if 'username' in session:
         return redirect(url_for('web_dynamic.serve', path='/'))
-    return send_from_directory(web_bp.static_folder, 'index.html')
+    return send_asset('index.html')
 
 @web_bp.route('/register')
 def register():
     if 'username' in session:
         return redirect(url_for('web_dynamic.serve', path='/'))
-    return send_from_directory(web_bp.static_folder, 'index.html')
+    return send_asset('index.html')
 
 @web_bp.route('/ttt_ai')
 def ttt_ai():
     # if 'username' in session:
     #     return redirect(url_for('web_dynamic.serve', path='/ttt_ai'))
-    return send_from_directory(web_bp.static_folder, 'index.html')
+    return send_asset('index.html')
 
 @web_bp.route('/tictactoe')
 def tictactoe():
     # if 'username' in session:
     #     return redirect(url_for('web_dynamic.serve', path='/tictactoe'))
-    return send_from_directory(web_bp.static_folder, 'index.html')
+    return send_asset('index.html')
 
 @web_bp.route('/status')
 def status():
     data = { "status": "ok", "msg": "Hello Human!"}
     return jsonify(data)
 
+@web_bp.route('/livez')
+def livez():
+    return jsonify({"status": "alive"})
+
+@web_bp.route('/readyz')
+def readyz():
+    if health.HEALTH is None:
+        return jsonify({"status": "starting"}), 503
+    ready, report = health.HEALTH.ready()
+    return jsonify(report), 200 if ready else 503
+
+@web_bp.route('/metrics')
+def metrics():
+    if not METRICS.enabled:
+        abort(404)
+    if not metrics_allowed():
+        abort(403)
+    return Response(METRICS.render(), mimetype='text/plain; version=0.0.4')
+
+def metrics_allowed():
+    """Whether the scraper sent `METRICS_TOKEN` or connects from `METRICS_ALLOWED_IPS`."""
+    token = current_app.config['METRICS_TOKEN']
+    sent = request.headers.get('Authorization', '')
+    if token and hmac.compare_digest(sent.encode(), f'Bearer {token}'.encode()):
+        return True
+    return request.remote_addr in current_app.config['METRICS_ALLOWED_IPS']
+
 @web_bp.route('/')
 def home():
     # if 'username' in session:
     #     return redirect(url_for('web_dynamic.serve', path='/tictactoe'))
-    return send_from_directory(web_bp.static_folder, 'index.html')
+    return send_asset('index.html')
 
 @web_bp.route('/modes')
 def modes():
-    return send_from_directory(web_bp.static_folder, 'index.html')
+    return send_asset('index.html')
 
 @web_bp.route('/', defaults={'path': ''})
 @web_bp.route('/<path:path>')
 def serve(path):
-    if path != "" and os.path.exists(web_bp.static_folder + '/' + path):
-        return send_from_directory(web_bp.static_folder, path)
-    else:
-        return send_from_directory(web_bp.static_folder, 'index.html')
+    asset = ASSETS.get(path) if path else None
+    if asset is not None:
+        return ASSETS.response(asset)
+    return send_asset('index.html')
+
+def init_assets(max_memory_size):
+    global ASSETS
+    ASSETS = AssetIndex(web_bp.static_folder, max_memory_size)